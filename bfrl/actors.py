@@ -1,6 +1,6 @@
 # modules
 from datetime import date
-import math
+import operator
 import pygame
 
 # game files
@@ -10,6 +10,28 @@ from bfrl import globals
 from bfrl import draw
 
 
+def component_property(name):
+    """
+    Creates the property of an actor component. Setting a component makes the actor its owner, and keeps the
+    component registries of the actor's map up to date. Reading it is a plain slot read.
+    :param name: component name, 'ai' for example. The component is stored in the '_ai' slot.
+    :return: property
+    """
+
+    slot = f'_{name}'
+
+    def set_component(actor, component):
+
+        setattr(actor, slot, component)
+        if component is not None:
+            component.owner = actor
+
+        if actor.game_map is not None:
+            actor.game_map.register(actor, name)
+
+    return property(operator.attrgetter(slot), set_component)
+
+
 class ObjActor:
     """
     The actor object represents every entity in the game that 'interacts' with the player or the environment
@@ -19,11 +41,30 @@ class ObjActor:
     ObjActor.flicker_speed : represents the conversion of animation length in seconds to number of frames
     ObjActor.flicker_timer : the current counter until the next frame of the animation should be displayed.
     ObjActor.sprite_image : the index location of the current image of the animation that is being displayed.
+    ObjActor.visual_position : (x, y) map position where the sprite is shown, slides towards (x, y) after a move.
+    ObjActor.previous_visual_position : visual position on the previous animation tick, used for interpolation.
+    ObjActor.game_map : map the actor was added to, whose registries track its components. None while carried.
 
     ** METHODS **
+    obj_Actor.animate() : advances the object animations by a time step.
     obj_Actor.draw() : this method draws the object to the screen.
     """
 
+    COMPONENTS = ('creature', 'ai', 'container', 'item', 'equipment', 'stairs', 'exit_portal')
+
+    __slots__ = (
+        'x', 'y', 'name_object', 'animation_key', 'animation', 'animation_speed', 'flicker_speed', 'flicker_timer',
+        'sprite_image', 'visual_position', 'previous_visual_position', 'depth', 'state', 'game_map',
+    ) + tuple(f'_{name}' for name in COMPONENTS)
+
+    creature = component_property('creature')
+    ai = component_property('ai')
+    container = component_property('container')
+    item = component_property('item')
+    equipment = component_property('equipment')
+    stairs = component_property('stairs')
+    exit_portal = component_property('exit_portal')
+
     def __init__(
         self,
         x,
@@ -68,42 +109,29 @@ class ObjActor:
         self.flicker_timer = 0.0
         self.sprite_image = 0
 
+        # position the sprite is drawn at, in tiles
+        self.visual_position = (x, y)
+        self.previous_visual_position = (x, y)
+
         # Draw depth relative to surface
         self.depth = depth
 
         self.state = state
 
-        self.creature = creature
-        if self.creature:
-            self.creature.owner = self
+        # set by the map the actor is added to
+        self.game_map = None
 
+        self.creature = creature
         self.ai = ai
-        if self.ai:
-            self.ai.owner = self
-
         self.container = container
-        if self.container:
-            self.container.owner = self
-
         self.item = item
-        if self.item:
-            self.item.owner = self
-
         self.equipment = equipment
-        if self.equipment:
-            self.equipment.owner = self
-
-            # adds an item component to the equipment'owner
-            self.item = ComponentItem()
-            self.item.owner = self
-
         self.stairs = stairs
-        if self.stairs:
-            self.stairs.owner = self
-
         self.exit_portal = exit_portal
-        if self.exit_portal:
-            self.exit_portal.owner = self
+
+        # adds an item component to the equipment'owner
+        if self.equipment:
+            self.item = ComponentItem()
 
     @property
     def display_name(self):
@@ -116,68 +144,89 @@ class ObjActor:
             else:
                 return self.name_object
 
-    def draw(self):
-        """draws the obj_Actor to the screen"""
-        is_visible = globals.FOV_MAP.fov[self.y, self.x]
-        x_cell = self.x * constants.CELL_WIDTH
-        y_cell = self.y * constants.CELL_HEIGHT
-
-        if is_visible:
-            if len(self.animation) == 1:
-                globals.SURFACE_MAP.blit(self.animation[0], (x_cell, y_cell))
-            elif len(self.animation) > 1:
-                if globals.CLOCK.get_fps() > 0.0:
-                    self.flicker_timer += 1 / globals.CLOCK.get_fps()
-                if self.flicker_timer >= self.flicker_speed:
-                    self.flicker_timer = 0.0
-                    if self.sprite_image >= len(self.animation) - 1:
-                        self.sprite_image = 0
-                    else:
-                        self.sprite_image += 1
-                draw_location = (x_cell, y_cell)
-                globals.SURFACE_MAP.blit(
-                    self.animation[self.sprite_image], draw_location
-                )
+    def animate(self, time_step):
+        """
+        Advances the sprite animation and the slide between tiles after a move.
+        :param time_step: time in seconds since the last animation tick
+        """
 
-    def animation_destroy(self):
-        self.animation = None
+        self.previous_visual_position = self.visual_position
 
-    def animation_initialize(self):
-        self.animation = globals.ASSETS.sprite(self.animation_key)
+        visual_x, visual_y = self.visual_position
+        dx = self.x - visual_x
+        dy = self.y - visual_y
+        distance = max(abs(dx), abs(dy))
+        step = time_step / constants.MOVE_ANIMATION_TIME
 
-    def set_position(self, coordinates):
-        self.x, self.y = coordinates
-
-    def distance_to(self, other):
+        if distance > 1.5:
+            # teleports, such as taking the stairs, are not animated
+            self.visual_position = self.previous_visual_position = (self.x, self.y)
+        elif distance <= step:
+            self.visual_position = (self.x, self.y)
+        else:
+            self.visual_position = (visual_x + dx / distance * step, visual_y + dy / distance * step)
+
+        if self.animation and len(self.animation) > 1:
+            self.flicker_timer += time_step
+            if self.flicker_timer >= self.flicker_speed:
+                self.flicker_timer = 0.0
+                if self.sprite_image >= len(self.animation) - 1:
+                    self.sprite_image = 0
+                else:
+                    self.sprite_image += 1
+
+    def draw_coordinates(self, alpha=1.0):
+        """
+        returns the pixel coordinates of the sprite, interpolated between the last two animation ticks.
+        :param alpha: fraction of the time between the last animation tick and the next one
+        :return: (x, y) pixel coordinates on the map surface
+        """
 
-        dx = other.x - self.x
-        dy = other.y - self.y
+        previous_x, previous_y = self.previous_visual_position
+        visual_x, visual_y = self.visual_position
 
-        return math.sqrt(dx**2 + dy**2)
+        x = previous_x + (visual_x - previous_x) * alpha
+        y = previous_y + (visual_y - previous_y) * alpha
 
-    def move_towards(self, other):
+        return int(x * constants.CELL_WIDTH), int(y * constants.CELL_HEIGHT)
 
-        dx = other.x - self.x
-        dy = other.y - self.y
+    def draw(self, alpha=1.0):
+        """
+        draws the obj_Actor to the screen
+        :param alpha: fraction of the time between the last animation tick and the next one
+        """
+        is_visible = globals.FOV_MAP.is_visible(self.x, self.y)
 
-        distance = math.sqrt(dx**2 + dy**2)
+        if is_visible:
+            coordinates = globals.CAMERA.map_to_window(self.draw_coordinates(alpha))
+            if len(self.animation) == 1:
+                globals.SURFACE_MAP.blit(self.animation[0], coordinates)
+            elif len(self.animation) > 1:
+                globals.SURFACE_MAP.blit(self.animation[self.sprite_image], coordinates)
 
-        dx = int(round(dx / distance, 0))
-        dy = int(round(dy / distance, 0))
+    @property
+    def animation_delay(self):
+        """
+        returns the time until the animation shows its next image.
+        :return: time in seconds, 0 while the actor slides between tiles, None if the actor is not animated
+        """
 
-        self.creature.move(dx, dy)
+        if self.visual_position != (self.x, self.y):
+            return 0.0
 
-    def move_away(self, other):
+        if not self.animation or len(self.animation) == 1:
+            return None
 
-        dx = self.x - other.x
-        dy = self.y - other.y
+        return max(self.flicker_speed - self.flicker_timer, 0.0)
 
-        distance = math.sqrt(dx**2 + dy**2)
+    def animation_destroy(self):
+        self.animation = None
 
-        dx = int(round(dx / distance, 0))
-        dy = int(round(dy / distance, 0))
+    def animation_initialize(self):
+        self.animation = globals.ASSETS.sprite(self.animation_key)
 
-        self.creature.move(dx, dy)
+    def set_position(self, coordinates):
+        self.x, self.y = coordinates
 
 
 class ComponentCreature:
@@ -213,22 +262,17 @@ class ComponentCreature:
         :param dy: difference of y from current location
         """
 
-        tile_is_wall = (
-            globals.GAME.current_map.map_tiles[self.owner.x + dx][
-                self.owner.y + dy
-            ].block_path
-            is True
-        )
+        game_map = globals.GAME.current_map
+        new_x, new_y = self.owner.x + dx, self.owner.y + dy
+
+        tile_is_wall = game_map.check_for_wall(new_x, new_y)
 
-        target = globals.GAME.current_map.check_for_creature(
-            self.owner.x + dx, self.owner.y + dy, self.owner
-        )
+        target = game_map.check_for_creature(new_x, new_y, self.owner)
         if target:
             self.attack(target)
 
         if not tile_is_wall and target is None:
-            self.owner.x += dx
-            self.owner.y += dy
+            game_map.place_occupant(self.owner, (new_x, new_y))
 
     def attack(self, target):
         """
@@ -242,7 +286,7 @@ class ComponentCreature:
 
         if damage_dealt > 0 and self.owner is globals.PLAYER:
             pygame.mixer.Sound.play(
-                globals.RANDOM_ENGINE.choice(globals.ASSETS.sound_hit_list)
+                globals.RANDOM_ENGINE.stream('audio').choice(globals.ASSETS.sound_hit_list)
             )
 
     @property
@@ -254,12 +298,8 @@ class ComponentCreature:
 
         total_power = self.base_attack
         if self.owner.container:
-            object_bonuses = [
-                obj.equipment.attack_bonus
-                for obj in self.owner.container.equipped_items
-            ]
-            for bonus in object_bonuses:
-                total_power += bonus
+            attack_bonus, _ = self.owner.container.equipment_bonuses
+            total_power += attack_bonus
 
         return total_power
 
@@ -272,12 +312,8 @@ class ComponentCreature:
 
         total_defense = self.base_defense
         if self.owner.container:
-            object_bonuses = [
-                obj.equipment.defense_bonus
-                for obj in self.owner.container.equipped_items
-            ]
-            for bonus in object_bonuses:
-                total_defense += bonus
+            _, defense_bonus = self.owner.container.equipment_bonuses
+            total_defense += defense_bonus
 
         return total_defense
 
@@ -307,32 +343,171 @@ class ComponentCreature:
 
 
 class ComponentContainer:
+    """
+    Containers hold an inventory of items. Besides the list of items, in the order they were picked up, the
+    container keeps indexes that are updated as items come and go, so lookups never scan the inventory.
+
+    ** PROPERTIES **
+    ComponentContainer.inventory : list of items, in the order they were added.
+    ComponentContainer.volume : total volume of the items held.
+    ComponentContainer.weight : total weight of the items held.
+    ComponentContainer.kinds : dictionary of item kind, 'usable', 'equipment' or 'quest', to the items of that kind.
+    ComponentContainer.equipped : items currently equipped, in the order they were equipped.
+    ComponentContainer.slots : dictionary of equipment slot to the item equipped in it.
+    ComponentContainer.observers : components notified when an item is added or removed.
+    ComponentContainer.revision : counter increased on every change of the inventory, for views that cache it.
+
+    ** METHODS **
+    ComponentContainer.subscribe : notifies a component of every item added to or removed from the container.
+    ComponentContainer.add : puts an item in the container.
+    ComponentContainer.remove : takes an item out of the container.
+    ComponentContainer.set_equipped : equips or unequips an item held by the container.
+    ComponentContainer.items_by_kind : returns the items grouped by kind, usable items first.
+    """
+
     def __init__(self, volume=10.0, inventory=None):
 
         self.max_volume = volume
-        if inventory is None:
-            inventory = []
-        self.inventory = inventory
+        self.inventory = []
 
-    # get names of everything in inventory
-    # get volume within container
-    @property
-    def volume(self):
-        return 0.0
+        self.volume = 0.0
+        self.weight = 0.0
+
+        # dictionaries are used as ordered sets
+        self.kinds = {'usable': {}, 'equipment': {}, 'quest': {}}
+        self.equipped = {}
+        self.slots = {}
+
+        # (attack bonus, defense bonus) of the equipped items, None until computed or after the equipment changed
+        self.cached_bonuses = None
+
+        self.observers = []
+        self.revision = 0
+
+        for obj in inventory or []:
+            self.add(obj)
+
+    def subscribe(self, observer):
+        """
+        Notifies a component of every change of the inventory, instead of having it check the inventory every turn.
+        :param observer: component with an inventory_changed(container, obj, added) method
+        """
+
+        self.observers.append(observer)
+
+    def unsubscribe(self, observer):
+        self.observers.remove(observer)
+
+    def notify(self, obj, added):
+
+        self.revision += 1
+        for observer in list(self.observers):
+            observer.inventory_changed(self, obj, added)
+
+    def add(self, obj):
+        """
+        Puts an item in the container. Does not check the capacity of the container.
+        :param obj: actor with an item component
+        """
+
+        self.inventory.append(obj)
+        self.volume += obj.item.volume
+        self.weight += obj.item.weight
+        self.kinds[item_kind(obj)][obj] = None
+
+        # items dropped while equipped are still equipped when picked up again
+        if obj.equipment and obj.equipment.equipped:
+            self.set_equipped(obj, True)
+
+        self.notify(obj, True)
+
+    def remove(self, obj):
+        """
+        Takes an item out of the container.
+        :param obj: actor held by the container
+        """
+
+        self.inventory.remove(obj)
+        self.volume -= obj.item.volume
+        self.weight -= obj.item.weight
+        del self.kinds[item_kind(obj)][obj]
+
+        if obj in self.equipped:
+            self.unindex_equipped(obj)
+
+        self.notify(obj, False)
+
+    def set_equipped(self, obj, equipped):
+        """
+        Equips or unequips an item held by the container.
+        :param obj: actor with an equipment component
+        :param equipped: True to equip the item, False to unequip it
+        """
+
+        obj.equipment.equipped = equipped
+        self.revision += 1
+        if equipped:
+            self.equipped[obj] = None
+            self.slots.setdefault(obj.equipment.slot, obj)
+            self.invalidate_bonuses()
+        elif obj in self.equipped:
+            self.unindex_equipped(obj)
+
+    def unindex_equipped(self, obj):
+
+        del self.equipped[obj]
+        slot = obj.equipment.slot
+        if self.slots.get(slot) is obj:
+            del self.slots[slot]
+
+            # another equipped item may share the slot, if it was picked up already equipped
+            for other in self.equipped:
+                if other.equipment.slot == slot:
+                    self.slots[slot] = other
+                    break
+
+        self.invalidate_bonuses()
+
+    def items_by_kind(self):
+        """
+        returns the items held by the container grouped by kind: usable items, then equipment, then quest items.
+        :return: list of items, in the order they were added within each kind
+        """
+
+        return [obj for items in self.kinds.values() for obj in items]
 
     @property
-    def equipped_items(self):
+    def equipment_bonuses(self):
         """
-        returns a list of all items that are currently equipped.
-        :return: list of equipped items
+        returns the bonuses of all equipped items. The sums are cached until an item is equipped, unequipped, picked
+        up or dropped.
+        :return: (attack bonus, defense bonus)
         """
 
-        list_of_equipped_items = [
-            obj for obj in self.inventory if obj.equipment and obj.equipment.equipped
-        ]
-        return list_of_equipped_items
+        if self.cached_bonuses is None:
+            self.cached_bonuses = (
+                sum(obj.equipment.attack_bonus for obj in self.equipped),
+                sum(obj.equipment.defense_bonus for obj in self.equipped),
+            )
+
+        return self.cached_bonuses
 
-    # get the weight of everything within container
+    def invalidate_bonuses(self):
+        self.cached_bonuses = None
+
+
+def item_kind(obj):
+    """
+    returns the kind of an item, used to index container inventories.
+    :param obj: actor with an item component
+    :return: 'equipment' for equipment, 'usable' for items with a use function, 'quest' for the others like the lamp
+    """
+
+    if obj.equipment:
+        return 'equipment'
+    if obj.item.use_function:
+        return 'usable'
+    return 'quest'
 
 
 class ComponentItem:
@@ -352,12 +527,12 @@ class ComponentItem:
             else:
                 game.message("Picking up")
                 # add item to actor inventory
-                actor.container.inventory.append(self.owner)
+                actor.container.add(self.owner)
                 # remove animation for game save
                 self.owner.animation = None
 
                 # remove item from globals.GAME
-                globals.GAME.objects_on_map.remove(self.owner)
+                globals.GAME.remove_object(self.owner)
 
                 # assigns container ownership to actor's container
                 self.container = actor.container
@@ -365,13 +540,13 @@ class ComponentItem:
     def drop(self, new_x, new_y):
 
         # add item to game objects
-        globals.GAME.objects_on_map.append(self.owner)
+        globals.GAME.add_object(self.owner)
 
         # load item animation
         self.owner.animation = globals.ASSETS.sprite(self.owner.animation_key)
 
         # remove item from actor container
-        self.container.inventory.remove(self.owner)
+        self.container.remove(self.owner)
 
         # drop item at actor position
         self.owner.x = new_x
@@ -391,7 +566,7 @@ class ComponentItem:
             if result is not None:
                 print("use_function_failed")
             else:
-                self.container.inventory.remove(self.owner)
+                self.container.remove(self.owner)
 
 
 class ComponentEquipment:
@@ -411,20 +586,22 @@ class ComponentEquipment:
 
     def equip(self):
 
-        # check for equipment in slot
-        all_equipped_items = self.owner.item.container.equipped_items
+        container = self.owner.item.container
 
-        for item in all_equipped_items:
-            if item.equipment.slot == self.slot:
-                game.message("equipment slot is occupied", constants.COLOR_RED)
-                return
+        # check for equipment in slot
+        if self.slot in container.slots:
+            game.message("equipment slot is occupied", constants.COLOR_RED)
+            return
 
         # equips if slot is free
-        self.equipped = True
+        container.set_equipped(self.owner, True)
         game.message("Item equipped")
 
     def unequip(self):
-        self.equipped = False
+        if self.owner.item.container:
+            self.owner.item.container.set_equipped(self.owner, False)
+        else:
+            self.equipped = False
         game.message("Item unequipped")
 
 
@@ -445,19 +622,22 @@ class ComponentExitPortal:
         self.closed_sprite = "S_PORTAL_CLOSED"
         self.found_lamp = False
 
-    def update(self):
+    def inventory_changed(self, container, obj, added):
+        """
+        Opens the portal when the lamp is added to the watched container, the player's inventory.
+        :param container: container that changed
+        :param obj: item added or removed
+        :param added: True if the item was added, False if it was removed
+        """
 
-        for obj in globals.PLAYER.container.inventory:
-            if obj.name_object == "The Lamp" and self.owner.state != "OPEN":
-                self.found_lamp = True
-                self.owner.state = "OPEN"
-                self.owner.animation_key = self.open_sprite
-                self.owner.animation = globals.ASSETS.sprite(self.open_sprite)
+        if added and obj.name_object == "The Lamp" and self.owner.state != "OPEN":
+            self.found_lamp = True
+            self.owner.state = "OPEN"
+            self.owner.animation_key = self.open_sprite
 
-        if not self.found_lamp and self.owner.state == "OPEN":
-            self.owner.state = "CLOSED"
-            self.owner.animation_key = self.closed_sprite
-            self.owner.animation = globals.ASSETS.sprite(self.closed_sprite)
+            # portals on other levels load their sprite from animation_key when the player comes back
+            if self.owner.game_map is globals.GAME.current_map:
+                self.owner.animation = globals.ASSETS.sprite(self.open_sprite)
 
     def use(self):
 
@@ -481,9 +661,7 @@ class ComponentExitPortal:
             filename = (
                 f"{globals.PLAYER.display_name}-{date.today().strftime('%Y%m%d')}.txt"
             )
-            with open(f"data/legacy/{filename}", "a+") as legacy_file:
-                for msg, _ in globals.GAME.message_history:
-                    legacy_file.write(f"{msg}\n")
+            globals.GAME.message_log.export(f"{constants.LEGACY_DIRECTORY}/{filename}")
 
             milliseconds_passed = 0
             while milliseconds_passed <= 2000:
@@ -1,5 +1,5 @@
 # modules
-import tcod
+import numpy as np
 
 # game files
 from bfrl import globals
@@ -19,7 +19,8 @@ class Confuse:
     def take_turn(self):
 
         if self.num_turns > 0:
-            self.owner.creature.move(tcod.random_get_int(None, -1, 1), tcod.random_get_int(None, -1, 1))
+            random_stream = globals.RANDOM_ENGINE.stream('ai')
+            self.owner.creature.move(random_stream.randint(-1, 1), random_stream.randint(-1, 1))
             self.num_turns -= 1
         else:
             self.owner.ai = self.old_ai
@@ -32,12 +33,21 @@ class Chase:
     """
 
     def take_turn(self):
+        take_turns([self.owner])
+
+    def act(self, is_visible, distance, step):
+        """
+        Acts on a decision computed by take_turns.
+        :param is_visible: True if the monster is in the player's field of view
+        :param distance: distance from the monster to the player
+        :param step: (dx, dy) step towards the player
+        """
 
         monster = self.owner
-        if globals.FOV_MAP.fov[monster.y, monster.x]:
+        if is_visible:
             # Moves towards the player if far away
-            if monster.distance_to(globals.PLAYER) >= 2:
-                monster.move_towards(globals.PLAYER)
+            if distance >= 2:
+                monster.creature.move(*step)
             # If close enough, attack player
             elif globals.PLAYER.creature.hp > 0:
                 monster.creature.attack(globals.PLAYER)
@@ -49,6 +59,56 @@ class Flee:
     """
 
     def take_turn(self):
-        monster = self.owner
-        if globals.FOV_MAP.fov[monster.y, monster.x]:
-            monster.move_away(globals.PLAYER)
+        take_turns([self.owner])
+
+    def act(self, is_visible, distance, step):
+
+        dx, dy = step
+        if is_visible:
+            self.owner.creature.move(-dx, -dy)
+
+
+# AIs whose decisions only depend on the monster and player positions, and are computed in batches
+BATCHED_AI = (Chase, Flee)
+
+
+def take_turns(monsters):
+    """
+    Runs the turn of every monster. The visibility, distance to the player and step towards the player of every
+    monster with a batched AI are computed in one vectorized pass, and monsters out of sight are skipped without
+    running any Python code for them. Moves and attacks are then resolved one monster at a time, in order, so each
+    monster finds the map as the monsters before it left it.
+    :param monsters: actors with an ai component, in turn order
+    """
+
+    monsters = list(monsters)
+    ai_components = [monster.ai for monster in monsters]
+    batched = np.fromiter([isinstance(ai_component, BATCHED_AI) for ai_component in ai_components], bool, len(monsters))
+
+    xs = np.fromiter([monster.x for monster in monsters], int, len(monsters))
+    ys = np.fromiter([monster.y for monster in monsters], int, len(monsters))
+    visible = globals.FOV_MAP.visible_at(xs, ys)
+
+    # batched AIs do nothing when the player can't see them
+    active = np.flatnonzero(visible | ~batched)
+    offsets = np.stack([globals.PLAYER.x - xs[active], globals.PLAYER.y - ys[active]], axis=1)
+
+    # same arithmetic as math.sqrt and round, which rounds halves to even like numpy.rint
+    distances = np.sqrt((offsets ** 2).sum(axis=1))[:, np.newaxis]
+    directions = np.zeros(offsets.shape)
+    np.divide(offsets, distances, out=directions, where=distances > 0)
+    steps = np.rint(directions).astype(int)
+
+    for index, is_visible, distance, step in zip(
+        active.tolist(), visible[active].tolist(), distances[:, 0].tolist(), steps.tolist()
+    ):
+        monster, ai_component = monsters[index], ai_components[index]
+
+        # the monster died, or its AI changed, earlier in the turn
+        if monster.ai is not ai_component:
+            continue
+
+        if isinstance(ai_component, BATCHED_AI):
+            ai_component.act(is_visible, distance, step)
+        else:
+            ai_component.take_turn()
@@ -0,0 +1,184 @@
+# modules
+import numpy as np
+import tcod
+
+# game files
+from bfrl import constants
+from bfrl import game
+from bfrl import maps
+
+
+class Line:
+    """
+    Tiles on a straight line from an origin tile to a target tile. Walls stop the line.
+
+    ** PROPERTIES **
+    Line.origin : (x, y) tile the line starts from.
+    Line.target : (x, y) tile the line is aimed at.
+    """
+
+    def __init__(self, origin, target):
+        self.origin = origin
+        self.target = target
+
+    def coordinates(self):
+        return maps.find_line(self.origin, self.target, as_array=True)
+
+
+class Circle:
+    """
+    Tiles within a radius of a center tile, seen from the center.
+
+    ** PROPERTIES **
+    Circle.origin : (x, y) center tile.
+    Circle.radius : radius in tiles.
+    """
+
+    def __init__(self, center, radius):
+        self.origin = center
+        self.radius = radius
+
+    def coordinates(self):
+        return maps.find_radius(self.origin, self.radius, as_array=True)
+
+
+class Square:
+    """
+    Tiles of a square centered on a tile, seen from the center.
+
+    ** PROPERTIES **
+    Square.origin : (x, y) center tile.
+    Square.radius : distance in tiles from the center to the sides of the square.
+    """
+
+    def __init__(self, center, radius):
+        self.origin = center
+        self.radius = radius
+
+    def coordinates(self):
+
+        offsets = np.arange(-self.radius, self.radius + 1)
+        xs, ys = np.meshgrid(offsets + self.origin[0], offsets + self.origin[1], indexing='ij')
+        return np.stack([xs.ravel(), ys.ravel()], axis=1)
+
+
+class Cone:
+    """
+    Tiles within a radius of an origin tile and an angle around the direction of a target tile, seen from the
+    origin. The origin tile itself is not part of the cone.
+
+    ** PROPERTIES **
+    Cone.origin : (x, y) tile the cone spreads from.
+    Cone.target : (x, y) tile the cone is aimed at.
+    Cone.radius : length of the cone in tiles.
+    Cone.angle : opening of the cone in degrees.
+    """
+
+    def __init__(self, origin, target, radius, angle=90):
+        self.origin = origin
+        self.target = target
+        self.radius = radius
+        self.angle = angle
+
+    def coordinates(self):
+
+        coordinates = Circle(self.origin, self.radius).coordinates()
+        offsets = coordinates - self.origin
+        direction = np.subtract(self.target, self.origin)
+
+        lengths = np.hypot(offsets[:, 0], offsets[:, 1]) * np.hypot(*direction)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cosines = offsets @ direction / lengths
+
+        return coordinates[cosines >= np.cos(np.radians(self.angle / 2))]
+
+
+def tiles(game_map, shape, occluded=True):
+    """
+    Finds the tiles covered by an area of effect.
+    :param game_map: map the area is on
+    :param shape: Line, Circle, Square or Cone
+    :param occluded: True if walls block the effect
+    :return: numpy array of shape (n, 2) with (x, y) per tile, closest to the origin of the shape first
+    """
+
+    coordinates, _, _ = query(game_map, shape, occluded)
+    return coordinates
+
+
+def query(game_map, shape, occluded):
+    """
+    Reads the map tiles around an area of effect once, and finds the tiles it covers. Lines stop at the first wall
+    past their origin, the other shapes only cover the tiles visible from their origin.
+    :return: covered tiles as returned by tiles, the rectangle of map tiles around them, as returned by
+    ChunkedGrid.region, and the (x, y) of the top left tile of that rectangle
+    """
+
+    coordinates = shape.coordinates()
+    coordinates = coordinates[
+        (coordinates[:, 0] >= 0) & (coordinates[:, 0] < game_map.map_width) &
+        (coordinates[:, 1] >= 0) & (coordinates[:, 1] < game_map.map_height)
+    ]
+    if len(coordinates) == 0:
+        return coordinates, np.empty((0, 0), dtype=maps.TILE_DTYPE), (0, 0)
+
+    x_min, y_min = np.minimum(coordinates.min(axis=0), shape.origin)
+    x_max, y_max = np.maximum(coordinates.max(axis=0), shape.origin) + 1
+    window = game_map.tiles.region(x_min, y_min, x_max, y_max)
+
+    if occluded and isinstance(shape, Line):
+        blocked = np.flatnonzero(window['wall'][coordinates[1:, 0] - x_min, coordinates[1:, 1] - y_min])
+        if len(blocked):
+            coordinates = coordinates[:blocked[0] + 2]
+    elif occluded:
+        visible = tcod.map.compute_fov(
+            ~window['wall'], (shape.origin[0] - x_min, shape.origin[1] - y_min), 0,
+            constants.FOV_LIGHT_WALLS, constants.FOV_ALGORITHM
+        )
+        coordinates = coordinates[visible[coordinates[:, 0] - x_min, coordinates[:, 1] - y_min]]
+
+    distances = ((coordinates - shape.origin) ** 2).sum(axis=1)
+    coordinates = coordinates[np.argsort(distances, kind='stable')]
+
+    return coordinates, window, (x_min, y_min)
+
+
+def affected(game_map, shape, occluded=True, exclude=None):
+    """
+    Finds the creatures caught in an area of effect, with a single read of the map tiles.
+    :param game_map: map the area is on
+    :param shape: Line, Circle, Square or Cone
+    :param occluded: True if walls block the effect
+    :param exclude: actor that is never affected, such as the caster of a bolt
+    :return: list of actors, closest to the origin of the shape first
+    """
+
+    coordinates, window, (x_min, y_min) = query(game_map, shape, occluded)
+    if len(coordinates) == 0:
+        return []
+
+    occupant_ids = window['occupant'][coordinates[:, 0] - x_min, coordinates[:, 1] - y_min]
+    targets = [game_map.occupants[occupant_id] for occupant_id in occupant_ids[occupant_ids >= 0].tolist()]
+
+    return [target for target in targets if target is not exclude]
+
+
+def damage(targets, amount, cause):
+    """
+    Damages every target, after reporting all of them in a single message.
+    :param targets: list of actors with a creature component
+    :param amount: damage taken by each target
+    :param cause: what hits the targets, 'a fireball' for example
+    """
+
+    if not targets:
+        return
+
+    names = [target.display_name for target in targets]
+    if len(names) == 1:
+        game.message(f'{names[0]} is hit by {cause} and takes {amount} damage!')
+    else:
+        game.message(f"{', '.join(names[:-1])} and {names[-1]} are hit by {cause} and take {amount} damage!")
+
+    for target in targets:
+        target.creature.take_damage(amount)
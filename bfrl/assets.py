@@ -1,4 +1,7 @@
 # modules
+import concurrent.futures
+import functools
+
 import pygame
 import yaml
 
@@ -16,12 +19,15 @@ class SpriteSheet:
     ObjectSpriteSheet.sprite_sheet : The loaded sprite sheet accessed through the file_name argument.
     """
 
-    def __init__(self, file_name):
+    def __init__(self, file_name, image=None):
         """
         :param file_name: String which contains the directory/filename of the image for use as a sprites sheet.
+        :param image: the sheet already decoded from file_name, if any. The file is loaded if None.
         """
         # load sprite sheet
-        self.sprite_sheet = pygame.image.load(file_name).convert()
+        if image is None:
+            image = pygame.image.load(file_name)
+        self.sprite_sheet = image.convert()
 
     def get_image(self, column, row, width=constants.CELL_WIDTH, height=constants.CELL_HEIGHT, scale=None):
         """
@@ -82,6 +88,12 @@ class SpriteSheet:
 class Assets:
     """
     This class is a structure that holds all assets used in the game. This includes sprites, sound effects, and music.
+    Image and sound files are decoded by a thread pool while the game starts. Each asset is built on the main thread
+    the first time it is requested, so the main menu can show while the level sprites are still loading.
+
+    ** METHODS **
+    Assets.sprite : returns an asset, waiting for its files if they are still being decoded.
+    Assets.join : builds every asset that is not ready yet and stops the thread pool.
     """
 
     def __init__(self):
@@ -92,9 +104,15 @@ class Assets:
         self.sound_list = []
         self.sound_hit_list = []
 
-        self.load_assets()
+        # files being decoded by path, and the function that builds each asset that is not ready yet
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=constants.ASSET_LOADER_THREADS, thread_name_prefix='assets'
+        )
+        self.files = {}
+        self.builders = {}
+
         self.sprite_dictionary = {}
-        self.generate_sprite_dictionary()
+        self.load_assets()
 
         self.sound_adjust()
 
@@ -103,12 +121,12 @@ class Assets:
         # load sheets
         sheets = self.game_assets.get('sprite_sheets')
         for name, path in sheets.items():
-            self.__setattr__(name, SpriteSheet(path))
+            self.decode(path, pygame.image.load)
+            self.builders[name] = functools.partial(self.build_sheet, path)
 
         # load walls
         wall_assets = self.game_assets.get('walls')
-        walls_tiles = self.load_wall_tiles(wall_assets)
-        self.__setattr__('walls', walls_tiles)
+        self.builders['walls'] = functools.partial(self.load_wall_tiles, wall_assets)
 
         # load sprites
         self.load_sprites('tiles', animation=False)
@@ -119,24 +137,39 @@ class Assets:
         # load background images
         bg_images = self.game_assets.get('bg_images')
         for bg_image, attributes in bg_images.items():
-            image = pygame.image.load(attributes['image'])
-            scale = (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT)
-            image_scaled = pygame.transform.scale(image, scale)
-            self.__setattr__(bg_image, image_scaled)
+            self.decode(attributes['image'], load_background)
+            self.builders[bg_image] = functools.partial(self.file, attributes['image'])
 
         # load music
         music = self.game_assets.get('music')
         for song, path in music.items():
             self.__setattr__(song, path)
+            self.sprite_dictionary[song] = path
 
         # load sounds
         sounds = self.game_assets.get('sounds')
         for sound, attributes in sounds.items():
-            sound_type = attributes.get('type')
-            sound_path = attributes.get('path')
-            self.__setattr__(sound, self.sound_add(sound_path))
-            if sound_type == 'hit':
-                self.sound_hit_list.append(self.__getattribute__(sound))
+            self.decode(attributes.get('path'), pygame.mixer.Sound)
+            self.builders[sound] = functools.partial(self.sound_add, attributes.get('path'), attributes.get('type'))
+
+    def decode(self, path, loader):
+        """
+        Starts decoding a file in the thread pool, unless it is already being decoded.
+        :param path: path of the file
+        :param loader: function that decodes the file, receives its path
+        """
+
+        if path not in self.files:
+            self.files[path] = self.executor.submit(loader, path)
+
+    def file(self, path):
+        """returns a decoded file, waiting for the thread pool if it is still being decoded"""
+
+        return self.files[path].result()
+
+    def build_sheet(self, path):
+
+        return SpriteSheet(path, self.file(path))
 
     def load_wall_tiles(self, wall_assets):
 
@@ -144,7 +177,7 @@ class Assets:
         wall_tiles = {}
         for wall_type, attributes in wall_assets.items():
             wall_tiles[wall_type] = {}
-            sprite_sheet = self.__getattribute__(attributes.get('sheet'))
+            sprite_sheet = self.sprite(attributes.get('sheet'))
             wall_width = attributes.get('width')
             wall_height = attributes.get('height')
             wall_scale = attributes.get('scale')
@@ -165,32 +198,43 @@ class Assets:
     def load_sprites(self, name, animation=True):
         asset_type = self.game_assets.get(name)
         for asset, attributes in asset_type.items():
-            sprite_sheet = self.__getattribute__(attributes.pop('sheet'))
-            if animation:
-                self.__setattr__(asset, sprite_sheet.get_animation(**attributes))
-            else:
-                self.__setattr__(asset, sprite_sheet.get_image(**attributes))
-
-    def generate_sprite_dictionary(self):
-
-        sprite_dict = {}
-        for category, assets in self.game_assets.items():
-            if category != 'walls':
-                for asset, attributes in assets.items():
-                    sprite_dict[asset] = self.__getattribute__(asset)
-            else:
-                sprite_dict['walls'] = {'default': 0, 'explored': 0}
-                sprite_dict['walls']['default'] = self.__getattribute__('walls')['default']
-                sprite_dict['walls']['explored'] = self.__getattribute__('walls')['explored']
-
-        self.sprite_dictionary = sprite_dict
+            self.builders[asset] = functools.partial(self.build_sprite, attributes.pop('sheet'), attributes, animation)
+
+    def build_sprite(self, sheet, attributes, animation):
+
+        sprite_sheet = self.sprite(sheet)
+        if animation:
+            return sprite_sheet.get_animation(**attributes)
+
+        return sprite_sheet.get_image(**attributes)
 
     def sprite(self, key):
+        """
+        returns an asset, building it the first time it is requested.
+        :param key: asset name, 'A_PLAYER' or 'walls' for example
+        """
+
+        if key not in self.sprite_dictionary:
+            asset = self.builders.pop(key)()
+            self.__setattr__(key, asset)
+            self.sprite_dictionary[key] = asset
+
         return self.sprite_dictionary[key]
 
-    def sound_add(self, file):
-        new_sound = pygame.mixer.Sound(file)
+    def join(self):
+        """Builds every asset that is not ready yet, in the order of the assets file, and stops the thread pool"""
+
+        for key in list(self.builders):
+            self.sprite(key)
+
+        self.executor.shutdown()
+
+    def sound_add(self, file, sound_type=None):
+        new_sound = self.file(file)
+        new_sound.set_volume(globals.PREFERENCES.volume_sound)
         self.sound_list.append(new_sound)
+        if sound_type == 'hit':
+            self.sound_hit_list.append(new_sound)
         return new_sound
 
     def sound_adjust(self):
@@ -199,3 +243,14 @@ class Assets:
             sound.set_volume(globals.PREFERENCES.volume_sound)
 
         pygame.mixer.music.set_volume(globals.PREFERENCES.volume_music)
+
+
+def load_background(path):
+    """
+    Decodes a background image and scales it to the size of the display. Runs in the thread pool of Assets.
+    :param path: path of the image
+    :return: pygame Surface
+    """
+
+    image = pygame.image.load(path)
+    return pygame.transform.scale(image, (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
@@ -0,0 +1,378 @@
+# modules
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# benchmarks always run headless, so pick the dummy SDL drivers before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+import tcod
+
+# game files
+from bfrl import assets
+from bfrl import constants
+from bfrl import draw
+from bfrl import game
+from bfrl import generator
+from bfrl import globals
+from bfrl import maps
+from bfrl import rng
+from bfrl import startup
+
+
+DEFAULT_OUTPUT = 'data/benchmarks/latest.json'
+DEFAULT_BASELINE = 'data/benchmarks/baseline.json'
+
+# (map width, map height, number of rooms)
+DUNGEON_SIZES = [
+    (20, 20, 2),
+    (60, 60, 20),
+    (120, 120, 80),
+    (400, 400, 4000),
+]
+
+MONSTER_COUNTS = [10, 100, 500]
+
+# map used by the fov, turn, draw and save benchmarks
+WORLD_SIZE = (80, 80, 40)
+
+
+@contextlib.contextmanager
+def map_size(width, height):
+    """
+    Temporarily overrides the map dimensions used by the game modules.
+    :param width: map width in tiles
+    :param height: map height in tiles
+    """
+
+    old_width, old_height = constants.MAP_WIDTH, constants.MAP_HEIGHT
+
+    constants.MAP_WIDTH = width
+    constants.MAP_HEIGHT = height
+    try:
+        yield
+    finally:
+        constants.MAP_WIDTH, constants.MAP_HEIGHT = old_width, old_height
+
+
+def seed(value=0):
+    """Seeds the game random service, and the benchmark's own placements, so runs are comparable"""
+
+    random.seed(value)
+    globals.RANDOM_ENGINE = rng.RandomService(value)
+    globals.NAME_POOL.reseed(globals.RANDOM_ENGINE)
+
+
+def timed(function, repeat, setup=None):
+    """
+    Times a function call several times.
+    :param function: callable to be timed. Receives the value returned by setup, if any.
+    :param repeat: number of timed runs
+    :param setup: optional callable executed before every run, outside of the timed region
+    :return: list of run times in seconds
+    """
+
+    run_times = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        if setup:
+            function(argument)
+        else:
+            function()
+        run_times.append(time.perf_counter() - start)
+
+    return run_times
+
+
+def summary(run_times, **params):
+
+    return {
+        'median': statistics.median(run_times),
+        'min': min(run_times),
+        'max': max(run_times),
+        'mean': statistics.fmean(run_times),
+        'runs': len(run_times),
+        'params': params,
+    }
+
+
+def new_map(width, height, number_of_rooms, generate=True):
+    """
+    Replaces the current map with a fresh one, keeping the current player.
+    :return: the new map
+    """
+
+    # the portal of the discarded map observes the player's inventory, it would drag that map into every save
+    for portal in globals.GAME.current_map.with_component('exit_portal'):
+        globals.PLAYER.container.unsubscribe(portal.exit_portal)
+
+    new_game_map = maps.GameMap(width, height)
+    globals.GAME.current_map = new_game_map
+    new_game_map.list_of_objects = [globals.PLAYER]
+    new_game_map.enter(globals.PLAYER)
+
+    if generate:
+        new_game_map.generate_dungeon(
+            number_of_rooms,
+            constants.ROOM_MIN_WIDTH, constants.ROOM_MAX_WIDTH,
+            constants.ROOM_MIN_HEIGHT, constants.ROOM_MAX_HEIGHT
+        )
+
+    return new_game_map
+
+
+def populate(number_of_monsters):
+    """Places a number of random enemies on floor tiles of the current map that no creature stands on"""
+
+    game_map = globals.GAME.current_map
+    tiles = game_map.tiles.region(0, 0, game_map.map_width, game_map.map_height)
+    floor_tiles = [tuple(tile) for tile in np.argwhere(~tiles['wall'] & (tiles['occupant'] < 0)).tolist()]
+
+    positions = np.array(random.sample(floor_tiles, number_of_monsters))
+    for monster in generator.spawn_batch('enemies', positions):
+        game_map.add_object(monster)
+
+
+def bench_generate_dungeon(results, repeat):
+
+    for width, height, number_of_rooms in DUNGEON_SIZES:
+        with map_size(width, height):
+            seed()
+            run_times = timed(
+                lambda game_map: game_map.generate_dungeon(
+                    number_of_rooms,
+                    constants.ROOM_MIN_WIDTH, constants.ROOM_MAX_WIDTH,
+                    constants.ROOM_MIN_HEIGHT, constants.ROOM_MAX_HEIGHT
+                ),
+                repeat,
+                setup=lambda: new_map(width, height, number_of_rooms, generate=False),
+            )
+        name = f'generate_dungeon[{width}x{height}/{number_of_rooms}]'
+        results[name] = summary(run_times, width=width, height=height, rooms=number_of_rooms)
+
+
+def bench_assign_tiles(results, repeat):
+
+    for width, height, number_of_rooms in DUNGEON_SIZES:
+        with map_size(width, height):
+            seed()
+            game_map = new_map(width, height, number_of_rooms)
+            run_times = timed(game_map.assign_tiles, repeat)
+        name = f'assign_tiles[{width}x{height}]'
+        results[name] = summary(run_times, width=width, height=height, rooms=number_of_rooms)
+
+
+def bench_fov(results, repeat):
+
+    width, height, number_of_rooms = WORLD_SIZE
+    with map_size(width, height):
+        seed()
+        new_map(width, height, number_of_rooms)
+
+        def calculate():
+            globals.FOV_CALCULATE = True
+            maps.calculate_fov()
+
+        run_times = timed(calculate, repeat)
+        results['calculate_fov'] = summary(run_times, width=width, height=height, radius=constants.TORCH_RADIUS)
+
+
+def bench_turn(results, repeat):
+
+    width, height, number_of_rooms = WORLD_SIZE
+    with map_size(width, height):
+        for number_of_monsters in MONSTER_COUNTS:
+            seed()
+            new_map(width, height, number_of_rooms)
+            populate(number_of_monsters)
+
+            # keep the player alive, a death screen would stall the benchmark
+            globals.PLAYER.creature.hp = globals.PLAYER.creature.max_hp = 10 ** 9
+            globals.FOV_CALCULATE = True
+            maps.calculate_fov()
+
+            run_times = timed(lambda: game.turn('player-moved'), repeat)
+            name = f'turn[{number_of_monsters} monsters]'
+            results[name] = summary(run_times, monsters=number_of_monsters, width=width, height=height)
+
+
+def bench_draw(results, repeat):
+
+    width, height, number_of_rooms = WORLD_SIZE
+    with map_size(width, height):
+        seed()
+        new_map(width, height, number_of_rooms)
+        populate(MONSTER_COUNTS[0])
+        globals.FOV_CALCULATE = True
+        maps.calculate_fov()
+
+        globals.CLOCK.tick()
+        run_times = timed(draw.game, repeat)
+        results['draw_game'] = summary(run_times, width=width, height=height, monsters=MONSTER_COUNTS[0])
+
+
+def bench_assets(results, repeat):
+
+    run_times = timed(lambda: assets.Assets().join(), repeat)
+    results['assets_init'] = summary(run_times)
+
+
+def bench_save_load(results, repeat):
+
+    width, height, number_of_rooms = WORLD_SIZE
+    with map_size(width, height), tempfile.TemporaryDirectory() as temporary_directory:
+        seed()
+        new_map(width, height, number_of_rooms)
+        populate(MONSTER_COUNTS[0])
+
+        file_path = os.path.join(temporary_directory, 'savegame')
+
+        def round_trip():
+            game.save(file_path)
+            game.load(file_path)
+
+        run_times = timed(round_trip, repeat)
+        results['save_load'] = summary(
+            run_times, width=width, height=height, monsters=MONSTER_COUNTS[0], bytes=os.path.getsize(file_path)
+        )
+
+
+BENCHMARKS = {
+    'generate_dungeon': bench_generate_dungeon,
+    'assign_tiles': bench_assign_tiles,
+    'fov': bench_fov,
+    'turn': bench_turn,
+    'draw': bench_draw,
+    'assets': bench_assets,
+    'save_load': bench_save_load,
+}
+
+
+def run(selected=None, repeat=5):
+    """
+    Runs the benchmark suite against a freshly started game.
+    :param selected: names of the benchmark groups to run. Runs all of them if None.
+    :param repeat: number of timed runs per benchmark
+    :return: dictionary of benchmark name to timing summary
+    """
+
+    startup.init()
+    globals.ASSETS.join()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        # the benchmark game streams its messages to a scratch file, not the player's log
+        constants.MESSAGE_LOG_PATH = os.path.join(temporary_directory, 'message_log')
+        game.new(seed=0)
+
+        # levels are generated on the spot while timing, a background worker would compete for the CPU
+        globals.LEVEL_GENERATOR.shutdown()
+
+        for name, benchmark in BENCHMARKS.items():
+            if selected and name not in selected:
+                continue
+            benchmark(results, repeat)
+
+        globals.GAME.message_log.delete()
+
+    return results
+
+
+def metadata():
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pygame': pygame.version.ver,
+        'tcod': tcod.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results against a baseline using the median run time.
+    :param results: current benchmark results
+    :param baseline: baseline benchmark results
+    :param tolerance: allowed relative slowdown before a benchmark counts as a regression, 0.2 means 20%
+    :return: dictionary of benchmark name to comparison
+    """
+
+    comparison = {}
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        ratio = current['median'] / baseline[name]['median'] if baseline[name]['median'] else float('inf')
+        comparison[name] = {
+            'baseline': baseline[name]['median'],
+            'current': current['median'],
+            'ratio': ratio,
+            'regression': ratio > 1 + tolerance,
+        }
+
+    return comparison
+
+
+def report(results, comparison):
+
+    name_width = max(len(name) for name in results)
+    for name, result in results.items():
+        line = f"{name:<{name_width}}  {result['median'] * 1000:10.3f} ms"
+        if name in comparison:
+            line += f"  x{comparison[name]['ratio']:.2f}"
+            if comparison[name]['regression']:
+                line += '  REGRESSION'
+        print(line)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Times the game entry points on the headless SDL driver.')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='file the results are written to')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='results file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown, 0.2 means 20%%')
+    parser.add_argument('benchmarks', nargs='*', help=f"benchmark groups to run: {', '.join(BENCHMARKS)}")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    results = run(args.benchmarks, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+    comparison = compare(results, baseline, args.tolerance)
+    report(results, comparison)
+
+    output = {'meta': metadata(), 'results': results, 'comparison': comparison}
+    for file_path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        with open(file_path, 'w') as output_file:
+            json.dump(output, output_file, indent=2)
+
+    pygame.quit()
+
+    return 1 if any(entry['regression'] for entry in comparison.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
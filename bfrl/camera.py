@@ -1,6 +1,3 @@
-# modules
-import pygame
-
 # game files
 from bfrl import constants
 from bfrl import globals
@@ -14,12 +11,6 @@ class ObjectCamera:
         self.height = constants.CAMERA_HEIGHT
         self.x, self.y = (0, 0)
 
-    @property
-    def rectangle(self):
-        camera_rectangle = pygame.Rect((0, 0), (self.width, self.height))
-        camera_rectangle.center = (self.x, self.y)
-        return camera_rectangle
-
     @property
     def map_address(self):
         map_x = int(self.x / constants.CELL_WIDTH)
@@ -27,16 +18,31 @@ class ObjectCamera:
 
         return map_x, map_y
 
-    def update(self):
+    def update(self, alpha=1.0):
 
-        target_x = globals.PLAYER.x * constants.CELL_WIDTH + constants.CELL_WIDTH / 2
-        target_y = globals.PLAYER.y * constants.CELL_HEIGHT + constants.CELL_HEIGHT / 2
+        player_x, player_y = globals.PLAYER.draw_coordinates(alpha)
+        target_x = player_x + constants.CELL_WIDTH / 2
+        target_y = player_y + constants.CELL_HEIGHT / 2
 
         distance_x, distance_y = self.map_distance((target_x, target_y))
 
         self.x += int(distance_x)
         self.y += int(distance_y)
 
+    def map_to_window(self, coordinates):
+        """
+        Converts a map pixel coordinate to a window pixel coordinate. The map surface only covers the window, so
+        this is also where map pixels are drawn on it.
+        :param coordinates: (x, y) map pixel coordinates
+        :return: (x, y) window pixel coordinates
+        """
+
+        map_x, map_y = coordinates
+        window_x = map_x - self.x + self.width // 2
+        window_y = map_y - self.y + self.height // 2
+
+        return window_x, window_y
+
     def window_to_map(self, coordinates):
 
         # convert coordinates to distance from camera
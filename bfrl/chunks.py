@@ -0,0 +1,187 @@
+# modules
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+
+class ChunkedGrid:
+    """
+    The chunked grid stores a map layer in square chunks of numpy arrays, indexed [x, y] like the map. Chunks are
+    only allocated when a tile in them is written, reading a tile that was never written returns the fill value.
+    Chunks that are not needed can be evicted to disk, and are loaded back the next time they are used.
+
+    ** PROPERTIES **
+    ChunkedGrid.width : grid width in tiles.
+    ChunkedGrid.height : grid height in tiles.
+    ChunkedGrid.chunk_size : width and height of a chunk in tiles.
+    ChunkedGrid.resident : dictionary of (chunk x, chunk y) to chunk array, for chunks kept in memory.
+    ChunkedGrid.evicted : set of (chunk x, chunk y) of chunks stored on disk.
+
+    ** METHODS **
+    ChunkedGrid.get : returns the value of a tile.
+    ChunkedGrid.set : changes the value of a tile.
+    ChunkedGrid.region : returns a rectangle of the grid as one array.
+    ChunkedGrid.write_region : writes an array to a rectangle of the grid.
+    ChunkedGrid.evict_outside : evicts the chunks far from a tile to disk.
+    ChunkedGrid.evict_all : evicts every chunk to disk.
+    """
+
+    def __init__(self, size, chunk_size, dtype, fill):
+        """
+        :param size: (width, height) of the grid in tiles
+        :param chunk_size: width and height of a chunk in tiles
+        :param dtype: numpy dtype of the tiles, usually a structured dtype with one field per tile property
+        :param fill: value of the tiles that were never written
+        """
+
+        self.width, self.height = size
+        self.chunk_size = chunk_size
+        self.dtype = np.dtype(dtype)
+        self.fill = np.array(fill, dtype=self.dtype)
+
+        self.resident = {}
+        self.evicted = set()
+        self.directory = None
+        self.finalizer = None
+
+    def __getstate__(self):
+
+        # saved grids carry every chunk, the eviction folder belongs to the running game
+        state = self.__dict__.copy()
+        state['resident'] = dict(self.resident)
+        state['resident'].update({key: np.load(self.chunk_path(key)) for key in self.evicted})
+        state['evicted'] = set()
+        state['directory'] = None
+        state['finalizer'] = None
+        return state
+
+    def chunk(self, key, allocate=False):
+        """
+        returns a chunk, loading it from disk if it was evicted.
+        :param key: (chunk x, chunk y)
+        :param allocate: True to create the chunk if it was never written
+        :return: chunk array, or None if the chunk was never written and allocate is False
+        """
+
+        if key in self.resident:
+            return self.resident[key]
+
+        if key in self.evicted:
+            self.evicted.remove(key)
+            chunk = np.load(self.chunk_path(key))
+        elif allocate:
+            chunk = np.full((self.chunk_size, self.chunk_size), self.fill, dtype=self.dtype)
+        else:
+            return None
+
+        self.resident[key] = chunk
+        return chunk
+
+    def chunk_path(self, key):
+
+        chunk_x, chunk_y = key
+        return os.path.join(self.directory, f'{chunk_x}_{chunk_y}.npy')
+
+    def get(self, x, y):
+
+        chunk = self.chunk((x // self.chunk_size, y // self.chunk_size))
+        if chunk is None:
+            return self.fill[()]
+
+        return chunk[x % self.chunk_size, y % self.chunk_size]
+
+    def set(self, x, y, value, field=None):
+
+        chunk = self.chunk((x // self.chunk_size, y // self.chunk_size), allocate=True)
+        if field is None:
+            chunk[x % self.chunk_size, y % self.chunk_size] = value
+        else:
+            chunk[field][x % self.chunk_size, y % self.chunk_size] = value
+
+    def chunk_slices(self, x_min, y_min, x_max, y_max):
+        """
+        Splits a rectangle of the grid by chunk.
+        :return: list of (chunk key, slices in the chunk, slices in the rectangle)
+        """
+
+        size = self.chunk_size
+        pieces = []
+        for chunk_x in range(x_min // size, (x_max - 1) // size + 1):
+            for chunk_y in range(y_min // size, (y_max - 1) // size + 1):
+                left, top = max(x_min, chunk_x * size), max(y_min, chunk_y * size)
+                right, bottom = min(x_max, (chunk_x + 1) * size), min(y_max, (chunk_y + 1) * size)
+
+                in_chunk = (slice(left - chunk_x * size, right - chunk_x * size),
+                            slice(top - chunk_y * size, bottom - chunk_y * size))
+                in_region = (slice(left - x_min, right - x_min), slice(top - y_min, bottom - y_min))
+                pieces.append(((chunk_x, chunk_y), in_chunk, in_region))
+
+        return pieces
+
+    def region(self, x_min, y_min, x_max, y_max):
+        """
+        returns a copy of a rectangle of the grid. Tiles outside of the grid get the fill value.
+        :return: numpy array of shape (x_max - x_min, y_max - y_min)
+        """
+
+        result = np.full((x_max - x_min, y_max - y_min), self.fill, dtype=self.dtype)
+
+        inside = (max(x_min, 0), max(y_min, 0), min(x_max, self.width), min(y_max, self.height))
+        if inside[0] >= inside[2] or inside[1] >= inside[3]:
+            return result
+
+        target = result[inside[0] - x_min:inside[2] - x_min, inside[1] - y_min:inside[3] - y_min]
+        for key, in_chunk, in_region in self.chunk_slices(*inside):
+            chunk = self.chunk(key)
+            if chunk is not None:
+                target[in_region] = chunk[in_chunk]
+
+        return result
+
+    def write_region(self, x_min, y_min, values, field=None):
+        """
+        Writes an array to a rectangle of the grid, allocating the chunks it covers.
+        :param x_min: x of the top left tile of the rectangle
+        :param y_min: y of the top left tile of the rectangle
+        :param values: numpy array with the new values, indexed [x, y]
+        :param field: name of the field written, for grids with a structured dtype. Writes whole tiles if None.
+        """
+
+        width, height = values.shape
+        for key, in_chunk, in_region in self.chunk_slices(x_min, y_min, x_min + width, y_min + height):
+            chunk = self.chunk(key, allocate=True)
+            if field is None:
+                chunk[in_chunk] = values[in_region]
+            else:
+                chunk[field][in_chunk] = values[in_region]
+
+    def evict(self, key):
+
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='bfrl-chunks-')
+            self.finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+        np.save(self.chunk_path(key), self.resident.pop(key))
+        self.evicted.add(key)
+
+    def evict_outside(self, x, y, radius):
+        """
+        Evicts to disk the chunks further than a number of chunks from a tile.
+        :param x: tile x coordinate
+        :param y: tile y coordinate
+        :param radius: distance in chunks of the chunks kept in memory
+        """
+
+        center_x, center_y = x // self.chunk_size, y // self.chunk_size
+        for key in list(self.resident):
+            chunk_x, chunk_y = key
+            if max(abs(chunk_x - center_x), abs(chunk_y - center_y)) > radius:
+                self.evict(key)
+
+    def evict_all(self):
+
+        for key in list(self.resident):
+            self.evict(key)
@@ -1,8 +1,6 @@
 import tcod
 import pygame
 
-pygame.init()
-
 
 # Game Sizes
 CAMERA_WIDTH = 1200
@@ -13,12 +11,26 @@ CELL_HEIGHT = 32
 # FPS LIMIT
 GAME_FPS = 60
 
+# Fixed animation time step, and the most steps run at once to catch up after a slow frame
+ANIMATION_TICK = 1 / 60
+ANIMATION_MAX_TICKS = 5
+
+# Time in seconds a sprite takes to slide to the next tile
+MOVE_ANIMATION_TIME = 0.08
+
 # Map Vars
 MAP_WIDTH = 20
 MAP_HEIGHT = 20
-MAP_MAX_NUM_ROOMS = 2
+MAP_MAX_NUM_ROOMS = 6
 MAP_LEVELS = 2
 
+# Maps are stored in square chunks, and only the chunks within MAP_CHUNK_RADIUS chunks of the player stay in memory
+MAP_CHUNK_SIZE = 32
+MAP_CHUNK_RADIUS = 2
+
+# Number of times a spawn position is drawn again when it lands on a wall or an occupied tile
+SPAWN_ATTEMPTS = 10
+
 # Room Limitations
 ROOM_MAX_HEIGHT = 3
 ROOM_MIN_HEIGHT = 3
@@ -37,17 +49,53 @@ COLOR_DEFAULT_BG = COLOR_GREY
 
 # Message Defaults
 NUM_MESSAGES = 4
+MESSAGE_LOG_SIZE = 100
+
+# Files
+SAVEGAME_PATH = 'data/savegame'
+MESSAGE_LOG_PATH = 'data/message_log'
+LEGACY_DIRECTORY = 'data/legacy'
+SPAWN_TABLES_PATH = 'data/spawns.yaml'
+NAME_GENERATOR_PATH = 'data/name_generator/celtic.cfg'
+
+# Creature names are generated NAME_BATCH_SIZE at a time for each name set, in a background thread if
+# NAME_BACKGROUND is True. A name already used on the level is drawn again up to NAME_ATTEMPTS times.
+NAME_SETS = ('Celtic male', 'Celtic female')
+NAME_BATCH_SIZE = 64
+NAME_BACKGROUND = True
+NAME_ATTEMPTS = 3
+
+# Threads decoding image and sound files while the game starts
+ASSET_LOADER_THREADS = 4
 
 # FOV Settings
 TORCH_RADIUS = 10
 FOV_LIGHT_WALLS = True
 FOV_ALGORITHM = tcod.FOV_BASIC
 
-# Fonts
-FONT_TITLE_SCREEN = pygame.font.Font('data/joystix.ttf', 26)
-FONT_DEBUG_MESSAGE = pygame.font.Font('data/joystix.ttf', 16)
-FONT_MESSAGE_TEXT = pygame.font.Font('data/joystix.ttf', 12)
-FONT_CURSOR_TEXT = pygame.font.Font('data/joystix.ttf', CELL_HEIGHT)
+# Fonts, loaded on first use as FONT_TITLE_SCREEN, FONT_DEBUG_MESSAGE, ...
+FONTS = {
+    'FONT_TITLE_SCREEN': ('data/joystix.ttf', 26),
+    'FONT_DEBUG_MESSAGE': ('data/joystix.ttf', 16),
+    'FONT_MESSAGE_TEXT': ('data/joystix.ttf', 12),
+    'FONT_CURSOR_TEXT': ('data/joystix.ttf', CELL_HEIGHT),
+}
+
+# Profiler
+PROFILER_MAX_FRAMES = 300
+PROFILER_GRAPH_SIZE = (300, 80)
+PROFILER_TARGET_FRAME_TIME = 1 / GAME_FPS
+PROFILER_STAGE_COLORS = {
+    'input': (80, 160, 255),
+    'fov': (255, 220, 0),
+    'turn': (255, 120, 0),
+    'animate': (255, 255, 255),
+    'map': (0, 200, 120),
+    'actors': (0, 255, 255),
+    'ui': (200, 100, 255),
+    'flip': (255, 0, 120),
+    'idle': COLOR_GREY,
+}
 
 # DEPTHS
 DEPTH_PLAYER = -100
@@ -55,3 +103,21 @@ DEPTH_CREATURES = 1
 DEPTH_ITEMS = 2
 DEPTH_CORPSE = 100
 DEPTH_STAIRS = 101
+
+
+def __getattr__(name):
+    """
+    Loads a font the first time it is used, so importing the constants does not initialize pygame.
+    :param name: constant name, 'FONT_MESSAGE_TEXT' for example
+    :return: pygame.font.Font
+    """
+
+    if name not in FONTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    if not pygame.font.get_init():
+        pygame.font.init()
+
+    font = pygame.font.Font(*FONTS[name])
+    globals()[name] = font
+    return font
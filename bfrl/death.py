@@ -25,9 +25,7 @@ def player(dead_player):
     draw.text(**death_text)
 
     filename = f"{globals.PLAYER.display_name}-{date.today().strftime('%Y%m%d')}.txt"
-    with open(f'data/legacy/{filename}', 'a+') as legacy_file:
-        for msg, _ in globals.GAME.message_history:
-            legacy_file.write(f'{msg}\n')
+    globals.GAME.message_log.export(f'{constants.LEGACY_DIRECTORY}/{filename}')
 
     milliseconds_passed = 0
     while milliseconds_passed <= 2000:
@@ -47,6 +45,7 @@ def monster(dead_monster):
     dead_monster.animation_key = 'S_FLESH_01'
     dead_monster.animation = globals.ASSETS.sprite('S_FLESH_01')
     dead_monster.depth = constants.DEPTH_CORPSE
+    globals.GAME.current_map.remove_occupant(dead_monster)
     dead_monster.creature = None
     dead_monster.ai = None
 
@@ -59,5 +58,6 @@ def mouse(dead_mouse):
     dead_mouse.animation = globals.ASSETS.sprite('S_FLESH_02')
     dead_mouse.name_object = 'Yummy meat'
     dead_mouse.depth = constants.DEPTH_CORPSE
+    globals.GAME.current_map.remove_occupant(dead_mouse)
     dead_mouse.creature = None
     dead_mouse.ai = None
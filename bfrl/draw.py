@@ -1,4 +1,5 @@
 # standard libraries
+import numpy as np
 import pygame
 
 # game files
@@ -116,30 +117,158 @@ class UISlider:
         pygame.draw.rect(self.surface, constants.COLOR_RED, self.grip_rect)
 
 
-def game():
+class UIList:
+    """
+    A scrolling list of text rows. Every row is rendered once, rows with the same text share their surfaces, and
+    only the rows inside the visible window are drawn. The list surface is only drawn again after it changed.
+    """
+
+    def __init__(self, size, font, color_text, color_background, color_mouse_over):
+
+        self.size = size
+        self.font = font
+        self.color_text = color_text
+        self.color_background = color_background
+        self.color_mouse_over = color_mouse_over
+
+        self.surface = pygame.Surface(size)
+        self.row_height = helper_text_height(font)
+        self.visible_rows = -(-size[1] // self.row_height)
+
+        # text to (default row, mouse over row) surfaces
+        self.rendered_rows = {}
+        self.rows = []
+
+        self.first_row = 0
+        self.highlighted_row = None
+        self.redraw = True
+
+    def set_items(self, item_texts):
+        """
+        Replaces the rows of the list, rendering only the texts that were not shown before.
+        :param item_texts: list of strings, one per row
+        """
+
+        rendered_rows = {}
+        for item_text in item_texts:
+            if item_text not in rendered_rows:
+                rendered_rows[item_text] = self.rendered_rows.get(item_text) or (
+                    helper_text_objects(item_text, self.font, self.color_text, self.color_background)[0],
+                    helper_text_objects(item_text, self.font, self.color_text, self.color_mouse_over)[0],
+                )
+
+        self.rendered_rows = rendered_rows
+        self.rows = [rendered_rows[item_text] for item_text in item_texts]
+        self.scroll(0)
+        self.redraw = True
+
+    def scroll(self, rows):
+
+        first_row = min(max(self.first_row + rows, 0), max(len(self.rows) - self.visible_rows, 0))
+        if first_row != self.first_row:
+            self.first_row = first_row
+            self.redraw = True
+
+    def row_at(self, y):
+        """
+        returns the row under a height of the list.
+        :param y: height in pixels, relative to the top of the list
+        :return: index of the row, None if there is no row there
+        """
+
+        row = self.first_row + int(y // self.row_height)
+        if y < 0 or row >= len(self.rows):
+            return None
+
+        return row
+
+    def highlight(self, row):
+
+        if row != self.highlighted_row:
+            self.highlighted_row = row
+            self.redraw = True
+
+    def draw(self):
+        """
+        returns the list surface, drawing the visible rows again only if the list changed.
+        :return: list surface
+        """
+
+        if self.redraw:
+            self.surface.fill(self.color_background)
+
+            last_row = min(self.first_row + self.visible_rows, len(self.rows))
+            for row in range(self.first_row, last_row):
+                default_row, mouse_over_row = self.rows[row]
+                row_surface = mouse_over_row if row == self.highlighted_row else default_row
+                self.surface.blit(row_surface, (0, (row - self.first_row) * self.row_height))
+
+            self.redraw = False
+
+        return self.surface
+
+
+def game(alpha=1.0):
+    """
+    Draws the game
+    :param alpha: fraction of the time between the last animation tick and the next one, used to interpolate sprites
+    """
 
     # global SURFACE_MAIN
 
     # clear the surface
     globals.SURFACE_MAIN.fill(constants.COLOR_DEFAULT_BG)
+
+    world(alpha)
+
+    globals.SURFACE_MAIN.blit(globals.SURFACE_MAP, (0, 0))
+    globals.PROFILER.mark('actors')
+
+    debug()
+    messages()
+    if globals.PROFILER.visible:
+        profiler()
+    globals.PROFILER.mark('ui')
+
+
+def world(alpha=1.0):
+    """
+    Draws the map and the objects on it to the map surface
+    :param alpha: fraction of the time between the last animation tick and the next one, used to interpolate sprites
+    """
+
     globals.SURFACE_MAP.fill(constants.COLOR_DEFAULT_BG)
 
-    globals.CAMERA.update()
+    globals.CAMERA.update(alpha)
 
     # draw the map
-    map_surface(globals.GAME.current_map.map_tiles)
+    map_surface(globals.GAME.current_map)
+    globals.PROFILER.mark('map')
 
     # draw the characters
     for obj in sorted(globals.GAME.objects_on_map, key=(lambda x: x.depth), reverse=True):
-        obj.draw()
+        obj.draw(alpha)
 
-    globals.SURFACE_MAIN.blit(globals.SURFACE_MAP, (0, 0), globals.CAMERA.rectangle)
 
-    debug()
-    messages()
+def animation_delay():
+    """
+    returns how long the screen can stay unchanged, which is the time until a visible actor changes animation image.
+    :return: time in seconds, None if no visible actor is animated
+    """
 
+    delays = [
+        obj.animation_delay for obj in globals.GAME.objects_on_map
+        if obj.animation_delay is not None and globals.FOV_MAP.is_visible(obj.x, obj.y)
+    ]
 
-def map_surface(map_to_draw):
+    return min(delays, default=None)
+
+
+def map_surface(game_map):
+    """
+    Draws the tiles of a map that are within the camera. Only the chunks of the map under the camera are read.
+    :param game_map: map to be drawn
+    """
 
     camera_x, camera_y = globals.CAMERA.map_address
     display_map_width = constants.CAMERA_WIDTH / constants.CELL_WIDTH
@@ -147,34 +276,44 @@ def map_surface(map_to_draw):
 
     # Define Dimensions of the map to be drawn
     render_width_min = max(int(camera_x - display_map_width / 2), 0)
-    render_width_max = min(int(camera_x + display_map_width / 2), constants.MAP_WIDTH)
+    render_width_max = min(int(camera_x + display_map_width / 2), game_map.map_width)
 
     render_height_min = max(int(camera_y - display_map_height / 2), 0)
-    render_height_max = min(int(camera_y + display_map_height / 2), constants.MAP_HEIGHT)
+    render_height_max = min(int(camera_y + display_map_height / 2), game_map.map_height)
+
+    if render_width_min >= render_width_max or render_height_min >= render_height_max:
+        return
+
+    bounds = (render_width_min, render_height_min, render_width_max, render_height_max)
+    tiles = game_map.tiles.region(*bounds)
+    visible_tiles = globals.FOV_MAP.region(*bounds)
+
+    # only the tiles the player sees, or has seen before, are drawn
+    xs, ys = np.nonzero(visible_tiles | tiles['explored'])
+    shown_tiles = zip(
+        (xs + render_width_min).tolist(), (ys + render_height_min).tolist(),
+        tiles['wall'][xs, ys].tolist(), tiles['assignment'][xs, ys].tolist(), visible_tiles[xs, ys].tolist()
+    )
 
     walls = globals.ASSETS.sprite('walls')
+    floor = globals.ASSETS.sprite('S_FLOOR')
+    floor_explored = globals.ASSETS.sprite('S_FLOOR_EXPLORED')
 
-    for x in range(render_width_min, render_width_max):
-        for y in range(render_height_min, render_height_max):
+    for x, y, is_wall, facing, is_visible in shown_tiles:
 
-            x_cell = x * constants.CELL_WIDTH
-            y_cell = y * constants.CELL_HEIGHT
+        cell = globals.CAMERA.map_to_window((x * constants.CELL_WIDTH, y * constants.CELL_HEIGHT))
 
-            is_visible = globals.FOV_MAP.fov[y, x]
-            if is_visible:
-                map_to_draw[x][y].explored = True
-                if map_to_draw[x][y].block_path:
-                    facing = map_to_draw[x][y].assignment
-                    globals.SURFACE_MAP.blit(walls['default'][facing], (x_cell, y_cell))
-                else:
-                    globals.SURFACE_MAP.blit(globals.ASSETS.sprite('S_FLOOR'), (x_cell, y_cell))
+        if is_visible:
+            if is_wall:
+                globals.SURFACE_MAP.blit(walls['default'][facing], cell)
+            else:
+                globals.SURFACE_MAP.blit(floor, cell)
 
-            elif map_to_draw[x][y].explored:
-                if map_to_draw[x][y].block_path:
-                    facing = map_to_draw[x][y].assignment
-                    globals.SURFACE_MAP.blit(walls['explored'][facing], (x_cell, y_cell))
-                else:
-                    globals.SURFACE_MAP.blit(globals.ASSETS.sprite('S_FLOOR_EXPLORED'), (x_cell, y_cell))
+        else:
+            if is_wall:
+                globals.SURFACE_MAP.blit(walls['explored'][facing], cell)
+            else:
+                globals.SURFACE_MAP.blit(floor_explored, cell)
 
 
 def debug():
@@ -184,12 +323,56 @@ def debug():
     text(globals.SURFACE_MAIN, debug_message, constants.FONT_DEBUG_MESSAGE, (0, 0), font_color, bg_color)
 
 
+def profiler():
+    """
+    Draws the profiler overlay: the time of each stage in the last frame and averaged over the ring buffer,
+    and a graph of the recorded frame times split by stage.
+    """
+
+    graph_width, graph_height = constants.PROFILER_GRAPH_SIZE
+    font = constants.FONT_MESSAGE_TEXT
+    text_height = helper_text_height(font)
+
+    overlay_x = constants.CAMERA_WIDTH - graph_width - 10
+    overlay_y = 10
+
+    last_frame = globals.PROFILER.last_frame
+    averages = globals.PROFILER.averages()
+
+    # timing breakdown
+    header = f"{'stage':<8}{'last':>8}{'avg':>8}"
+    text(globals.SURFACE_MAIN, header, font, (overlay_x, overlay_y), constants.COLOR_WHITE, constants.COLOR_BLACK)
+    for line, (stage, color) in enumerate(constants.PROFILER_STAGE_COLORS.items(), start=1):
+        stage_text = f"{stage:<8}{last_frame.get(stage, 0.0) * 1000:>8.2f}{averages.get(stage, 0.0) * 1000:>8.2f}"
+        location = (overlay_x, overlay_y + line * text_height)
+        text(globals.SURFACE_MAIN, stage_text, font, location, color, constants.COLOR_BLACK)
+
+    # frame time graph, one column per frame stacked by stage, scaled so the target frame time is half the graph
+    graph_y = overlay_y + (len(constants.PROFILER_STAGE_COLORS) + 1) * text_height + 5
+    graph_rect = pygame.Rect(overlay_x, graph_y, graph_width, graph_height)
+    pygame.draw.rect(globals.SURFACE_MAIN, constants.COLOR_BLACK, graph_rect)
+
+    pixels_per_second = graph_height / (2 * constants.PROFILER_TARGET_FRAME_TIME)
+    frames = list(globals.PROFILER.frames)[-graph_width:]
+    for column, frame in enumerate(frames):
+        bar_bottom = graph_rect.bottom
+        for stage, duration in globals.PROFILER.stage_totals(frame).items():
+            bar_height = min(int(duration * pixels_per_second), bar_bottom - graph_rect.top)
+            if bar_height <= 0:
+                continue
+            color = constants.PROFILER_STAGE_COLORS.get(stage, constants.COLOR_WHITE)
+            x = graph_rect.left + column
+            pygame.draw.line(globals.SURFACE_MAIN, color, (x, bar_bottom - 1), (x, bar_bottom - bar_height))
+            bar_bottom -= bar_height
+
+    target_y = graph_rect.bottom - graph_height // 2
+    target_line = ((graph_rect.left, target_y), (graph_rect.right, target_y))
+    pygame.draw.line(globals.SURFACE_MAIN, constants.COLOR_RED, *target_line)
+
+
 def messages():
 
-    if len(globals.GAME.message_history) <= constants.NUM_MESSAGES:
-        to_draw = globals.GAME.message_history
-    else:
-        to_draw = globals.GAME.message_history[-constants.NUM_MESSAGES:]
+    to_draw = globals.GAME.message_log.last(constants.NUM_MESSAGES)
 
     text_height = helper_text_height(constants.FONT_MESSAGE_TEXT)
 
@@ -249,7 +432,7 @@ def tile_rect(coordinates, tile_color=None, tile_alpha=150, marker=None):
         text(new_surface, marker, font=marker_font, coordinates=(mx, my), text_color=marker_color, alignment=align)
 
     # SURFACE_MAIN
-    globals.SURFACE_MAP.blit(new_surface, (new_x, new_y))
+    globals.SURFACE_MAP.blit(new_surface, globals.CAMERA.map_to_window((new_x, new_y)))
 
 
 def helper_text_objects(incoming_text, incoming_font, incoming_color, incoming_background):
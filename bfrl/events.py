@@ -0,0 +1,164 @@
+# modules
+import collections
+import json
+import pygame
+
+# game files
+from bfrl import globals
+
+
+# event types and attributes kept in input recordings
+RECORDED_EVENTS = {
+    pygame.QUIT: [],
+    pygame.KEYDOWN: ['key', 'mod', 'unicode'],
+    pygame.KEYUP: ['key', 'mod'],
+    pygame.MOUSEBUTTONDOWN: ['button', 'pos'],
+    pygame.MOUSEBUTTONUP: ['button', 'pos'],
+    pygame.MOUSEMOTION: ['pos'],
+}
+
+
+class ReplayFinished(Exception):
+    """Raised when a replayed session runs out of recorded input"""
+
+
+class InputRecorder:
+    """
+    The input recorder writes every batch of input events, and every mouse position read by the game, to a file.
+    Together with the game seed this is enough to replay the session.
+
+    ** METHODS **
+    InputRecorder.record_events : writes a batch of events returned by wait.
+    InputRecorder.record_mouse : writes a mouse position returned by mouse_position.
+    InputRecorder.close : closes the recording file.
+    """
+
+    def __init__(self, file_path, seed):
+        """
+        :param file_path: path of the recording file
+        :param seed: seed of the recorded game
+        """
+
+        # line buffered, so the recording survives the game exiting without closing it
+        self.file = open(file_path, 'w', buffering=1)
+        self.write({'seed': seed})
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + '\n')
+
+    def record_events(self, events_list):
+
+        recorded = []
+        for event in events_list:
+            if event.type in RECORDED_EVENTS:
+                attributes = {name: getattr(event, name) for name in RECORDED_EVENTS[event.type]}
+                recorded.append([event.type, attributes])
+
+        self.write({'events': recorded})
+
+    def record_mouse(self, position):
+        self.write({'mouse': list(position)})
+
+    def close(self):
+        self.file.close()
+
+
+class InputReplay:
+    """
+    The input replay feeds a recorded session back to the game, in the same order and without waiting.
+
+    ** PROPERTIES **
+    InputReplay.seed : seed of the recorded game.
+    InputReplay.batches : number of event batches replayed so far.
+
+    ** METHODS **
+    InputReplay.next_events : returns the next recorded batch of events.
+    InputReplay.next_mouse_position : returns the next recorded mouse position.
+    """
+
+    def __init__(self, file_path):
+        """
+        :param file_path: path of a file written by InputRecorder
+        """
+
+        with open(file_path, 'r') as recording_file:
+            records = [json.loads(line) for line in recording_file if line.strip()]
+
+        self.seed = records[0]['seed']
+        self.records = collections.deque(records[1:])
+        self.batches = 0
+
+    def next_record(self, kind):
+
+        if not self.records:
+            raise ReplayFinished()
+
+        record = self.records.popleft()
+        if kind not in record:
+            raise ValueError(f'replay is out of sync, expected {kind} but found {list(record)}')
+
+        return record[kind]
+
+    def next_events(self):
+
+        self.batches += 1
+        return [pygame.event.Event(event_type, attributes) for event_type, attributes in self.next_record('events')]
+
+    def next_mouse_position(self):
+        return tuple(self.next_record('mouse'))
+
+
+def wait(timeout=None):
+    """
+    Sleeps until an input event arrives or the timeout expires, then returns every pending event in order.
+    The process does not use the CPU while waiting, so idle screens should call this instead of polling.
+    :param timeout: maximum time to wait in seconds. Waits until an event arrives if None, does not wait if 0.
+    :return: list of pending events. Empty if the timeout expired without input.
+    """
+
+    # replayed sessions never wait
+    if globals.INPUT_REPLAY:
+        return globals.INPUT_REPLAY.next_events()
+
+    if timeout == 0:
+        events_list = pygame.event.get()
+    else:
+        if timeout is None:
+            first_event = pygame.event.wait()
+        else:
+            first_event = pygame.event.wait(max(int(timeout * 1000), 1))
+
+        events_list = [] if first_event.type == pygame.NOEVENT else [first_event]
+        events_list.extend(pygame.event.get())
+
+    if globals.INPUT_RECORDER:
+        globals.INPUT_RECORDER.record_events(events_list)
+
+    return events_list
+
+
+def mouse_position():
+    """
+    returns the mouse position. Screens whose result depends on the mouse read it here so it can be recorded.
+    :return: (x, y) window coordinates
+    """
+
+    if globals.INPUT_REPLAY:
+        return globals.INPUT_REPLAY.next_mouse_position()
+
+    position = pygame.mouse.get_pos()
+    if globals.INPUT_RECORDER:
+        globals.INPUT_RECORDER.record_mouse(position)
+
+    return position
+
+
+def requires_redraw(events_list):
+    """
+    Checks if a batch of events changes what is shown on screen. Mouse motion only matters to screens that track
+    the mouse, so it is ignored here.
+    :param events_list: list of events returned by wait
+    :return: True if the screen should be drawn again
+    """
+
+    return any(event.type != pygame.MOUSEMOTION for event in events_list)
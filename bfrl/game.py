@@ -4,14 +4,20 @@ import os
 import pickle
 import pygame
 import sys
+import tempfile
+import time
 
 # game files
+from bfrl import ai
 from bfrl import constants
 from bfrl import globals
 from bfrl import maps
+from bfrl import message_log
 from bfrl import draw
+from bfrl import events
 from bfrl import menu
 from bfrl import generator
+from bfrl import rng
 
 
 class ObjectGame:
@@ -22,13 +28,17 @@ class ObjectGame:
     ** PROPERTIES **
     ObjectGame.current_map : whatever map is currently loaded.
     ObjectGame.current_objects : list of objects for the current map.
-    ObjectGame.message_history : list of messages that have been pushed to the player over the course of a game.
+    ObjectGame.level : number of the current level, starting at 1.
+    ObjectGame.seed : seed the game was generated from. None once the game has been saved and loaded.
+    ObjectGame.message_log : messages that have been pushed to the player over the course of a game. Only the most
+    recent ones are kept in memory, the full history is streamed to disk.
     """
 
     def __init__(self):
 
         self.current_map = None
-        self.message_history = []
+        self.seed = None
+        self.message_log = message_log.MessageLog(constants.MESSAGE_LOG_PATH, constants.MESSAGE_LOG_SIZE)
         self.maps_previous = []
         self.maps_next = []
 
@@ -38,8 +48,10 @@ class ObjectGame:
         for obj in self.objects_on_map:
             obj.animation_destroy()
 
-        # save current map to previous maps
+        # save current map to previous maps, its tiles wait on disk until the player comes back
         self.maps_previous.append((globals.PLAYER.x, globals.PLAYER.y, self.current_map, self.objects_on_map))
+        self.current_map.remove_occupant(globals.PLAYER)
+        self.current_map.tiles.evict_all()
 
         if len(self.maps_next) == 0:
 
@@ -48,6 +60,7 @@ class ObjectGame:
 
             # clear current_objects list
             self.current_map.list_of_objects = [globals.PLAYER]
+            self.current_map.enter(globals.PLAYER)
 
             # initialize player animation
             globals.PLAYER.animation_initialize()
@@ -61,16 +74,16 @@ class ObjectGame:
 
         else:
             # load next map
-            globals.PLAYER.x, globals.PLAYER.y, self.current_map, objects_on_map = self.maps_next.pop(-1)
+            player_x, player_y, self.current_map, objects_on_map = self.maps_next.pop(-1)
             self.current_map.list_of_objects = objects_on_map
+            self.current_map.enter(globals.PLAYER)
+            self.current_map.place_occupant(globals.PLAYER, (player_x, player_y))
 
             # load destroyed surfaces
             for obj in self.objects_on_map:
                 obj.animation_initialize()
 
-            # calculate FOV
-            maps.make_fov(self.current_map.map_tiles)
-
+        self.prepare_next_level()
         globals.FOV_CALCULATE = True
 
     def transition_previous(self):
@@ -81,45 +94,95 @@ class ObjectGame:
             for obj in self.objects_on_map:
                 obj.animation = None
 
-            # save current map to next maps
+            # save current map to next maps, its tiles wait on disk until the player comes back
             self.maps_next.append((globals.PLAYER.x, globals.PLAYER.y, self.current_map, self.objects_on_map))
+            self.current_map.remove_occupant(globals.PLAYER)
+            self.current_map.tiles.evict_all()
 
             # load last map
-            globals.PLAYER.x, globals.PLAYER.y, self.current_map, objects = self.maps_previous.pop(-1)
+            player_x, player_y, self.current_map, objects = self.maps_previous.pop(-1)
             self.current_map.list_of_objects = objects
+            self.current_map.enter(globals.PLAYER)
+            self.current_map.place_occupant(globals.PLAYER, (player_x, player_y))
 
             # load destroyed surfaces on previous map
             for obj in self.objects_on_map:
                 obj.animation = globals.ASSETS.sprite(obj.animation_key)
 
             # calculate fov
-            maps.make_fov(self.current_map.map_tiles)
             globals.FOV_CALCULATE = True
 
+    def prepare_next_level(self):
+        """
+        Starts generating the layout of the next level in the background, if it has not been visited yet, and the
+        creature names used to populate it.
+        """
+
+        globals.NAME_POOL.refill()
+
+        if self.maps_next or self.level >= constants.MAP_LEVELS:
+            return
+
+        globals.LEVEL_GENERATOR.request(*maps.layout_arguments(
+            self.level + 1, constants.MAP_WIDTH, constants.MAP_HEIGHT, constants.MAP_MAX_NUM_ROOMS,
+            (constants.ROOM_MIN_WIDTH, constants.ROOM_MAX_WIDTH, constants.ROOM_MIN_HEIGHT, constants.ROOM_MAX_HEIGHT)
+        ))
+
+    @property
+    def level(self):
+        return len(self.maps_previous) + 1
+
     @property
     def objects_on_map(self):
         return self.current_map.list_of_objects
 
     def add_object(self, object_to_add):
-        self.current_map.list_of_objects.append(object_to_add)
+        self.current_map.add_object(object_to_add)
 
     def remove_object(self, object_to_remove):
-        self.current_map.list_of_objects.remove(object_to_remove)
+        self.current_map.remove_object(object_to_remove)
 
 
 def main_loop():
     """
-    Runs the game main loop
+    Runs the game main loop. Simulation and rendering are decoupled:
+    - player actions and the turns they trigger are resolved as soon as the input arrives.
+    - animations advance in fixed time steps, catching up after slow frames.
+    - the screen is drawn at most GAME_FPS times per second, only when something changed, and the frame is dropped
+      while more input is waiting so that input is never delayed by drawing.
+    The loop sleeps until there is input, a frame is due or an animation needs a new image.
     """
 
     # get game state from global game object
     # substitute game_quit = False
 
+    frame_time = 1 / constants.GAME_FPS
+    max_animation_lag = constants.ANIMATION_TICK * constants.ANIMATION_MAX_TICKS
+
+    # the level sprites may still be loading behind the main menu
+    globals.ASSETS.join()
+
+    # draw the first frame before waiting for input
+    maps.calculate_fov()
+    draw.game()
+    pygame.display.flip()
+
+    previous_time = last_frame_time = time.perf_counter()
+    animation_lag = 0.0
+    redraw = False
+
     game_quit = False
     while not game_quit:
 
-        # Handle Player Input
-        player_action = handle_keys()
+        globals.PROFILER.begin_frame()
+
+        # wait for input, or until the next frame is due if the screen changed, or the next animation image
+        if redraw:
+            wait_timeout = max(frame_time - (time.perf_counter() - last_frame_time), 0)
+        else:
+            wait_timeout = draw.animation_delay()
+        events_list = events.wait(wait_timeout)
+        globals.PROFILER.mark('idle')
 
         # example of how to handle input based on game state
         # for event in pygame.event.get():
@@ -127,28 +190,70 @@ def main_loop():
         #     ui.process_ui_events(event)
         #     ui.handle_ui_events(event)
 
-        maps.calculate_fov()
+        # handle every pending input in order, resolving the turn after each one
+        for event in events_list:
+
+            # Handle Player Input
+            player_action = handle_keys(event)
+            globals.PROFILER.mark('input')
 
-        if player_action == 'QUIT':
-            exit_game()
+            if player_action == 'QUIT':
+                exit_game()
 
-        # Process Turn Queue
-        turn(player_action)
+            maps.calculate_fov()
+            globals.PROFILER.mark('fov')
+
+            # Process Turn Queue
+            turn(player_action)
+            globals.PROFILER.mark('turn')
+
+            if globals.PLAYER.state in ['STATUS DEAD', 'STATUS WIN']:
+                break
 
         if globals.PLAYER.state in ['STATUS DEAD', 'STATUS WIN']:
             try:
-                os.remove('data/savegame')
+                os.remove(constants.SAVEGAME_PATH)
             except OSError:
                 pass
+            globals.GAME.message_log.delete()
             game_quit = True
 
-        # draw the game
-        draw.game()
+        # advance animations in fixed steps, dropping time that is too far behind to catch up with
+        now = time.perf_counter()
+        animation_lag = min(animation_lag + now - previous_time, max_animation_lag)
+        previous_time = now
+        while animation_lag >= constants.ANIMATION_TICK:
+            animate(constants.ANIMATION_TICK)
+            animation_lag -= constants.ANIMATION_TICK
+        globals.PROFILER.mark('animate')
+
+        # the screen needs a new frame if the input changed it, or if the wait ended because an animation is due
+        redraw = redraw or not events_list or events.requires_redraw(events_list)
+
+        # draw the game if a frame is due, unless more input is waiting to be handled first
+        frame_due = now - last_frame_time >= frame_time
+        if redraw and frame_due and not pygame.event.peek([pygame.KEYDOWN, pygame.QUIT]):
+            draw.game(animation_lag / constants.ANIMATION_TICK)
+
+            # update the display
+            pygame.display.flip()
+            globals.PROFILER.mark('flip')
+
+            globals.CLOCK.tick()
+            last_frame_time = now
+            redraw = False
+
+        globals.PROFILER.end_frame()
 
-        # update the display
-        pygame.display.flip()
 
-        globals.CLOCK.tick(constants.GAME_FPS)
+def animate(time_step):
+    """
+    Advances the animations of every object on the current map.
+    :param time_step: time in seconds since the last animation tick
+    """
+
+    for obj in globals.GAME.objects_on_map:
+        obj.animate(time_step)
 
 
 def turn(player_action):
@@ -166,86 +271,92 @@ def turn(player_action):
     #     take_turn(turn_holder)  # have the ai run on the ai who is turn holder only
 
     if player_action != 'no-action':
-        for obj in globals.GAME.objects_on_map:
-            if obj.ai:
-                obj.ai.take_turn()
-            if obj.exit_portal:
-                obj.exit_portal.update()
+        ai.take_turns(globals.GAME.current_map.with_component('ai'))
 
 
-def handle_keys():
+def handle_keys(event):
     """
-    Handles player inputs
+    Handles a player input
+    :param event: input event to be handled
+    :return: action taken by the player
     """
 
-    # get player input
-    keys_list = pygame.key.get_pressed()
-    events = pygame.event.get()
-
     # Check for mod key
-    mod_key = keys_list[pygame.K_RSHIFT] or keys_list[pygame.K_LSHIFT]
-
-    for event in events:
-        # Quit game if player closes window
-        if event.type == pygame.QUIT:
-            return 'QUIT'
-        if event.type == pygame.KEYDOWN:
-            # moves up by pressing the "Up" key
-            if event.key == pygame.K_UP:
-                globals.PLAYER.creature.move(0, -1)
-                globals.FOV_CALCULATE = True
-                return 'player-moved'
-            # moves down by pressing the "Down" key
-            if event.key == pygame.K_DOWN:
-                globals.PLAYER.creature.move(0, 1)
-                globals.FOV_CALCULATE = True
-                return 'player-moved'
-            # moves left by pressing the "Left" key
-            if event.key == pygame.K_LEFT:
-                globals.PLAYER.creature.move(-1, 0)
-                globals.FOV_CALCULATE = True
-                return 'player-moved'
-            # moves right by pressing the "Right" key
-            if event.key == pygame.K_RIGHT:
-                globals.PLAYER.creature.move(1, 0)
-                globals.FOV_CALCULATE = True
-                return 'player-moved'
-            # Gets item from the ground by pressing the "g" key
-            if event.key == pygame.K_g:
-                objects_at_player = maps.objects_at_coordinates(globals.PLAYER.x, globals.PLAYER.y)
-                for obj in objects_at_player:
-                    if obj.item:
-                        obj.item.pick_up(globals.PLAYER)
-            # Drops first item in the inventory onto the ground by pressing the "d" key
-            if event.key == pygame.K_d:
-                if len(globals.PLAYER.container.inventory) > 0:
-                    globals.PLAYER.container.inventory[-1].item.drop(globals.PLAYER.x, globals.PLAYER.y)
-            # Pauses the game by pressing the "p" key
-            if event.key == pygame.K_p:
-                menu.pause()
-            # Opens the inventory menu by pressing the "i" key
-            if event.key == pygame.K_i:
-                menu.inventory()
-            # Open look menu by pressing the "l" key
-            if event.key == pygame.K_l:
-                menu.tile_select()
-            # Go down or up stairs by pressing "SHIT + ."
-            if mod_key and event.key == pygame.K_PERIOD:
-                objects_at_player = maps.objects_at_coordinates(globals.PLAYER.x, globals.PLAYER.y)
-                for obj in objects_at_player:
-                    if obj.stairs:
-                        obj.stairs.use()
-                    if obj.exit_portal:
-                        obj.exit_portal.use()
+    mod_key = event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_SHIFT
+
+    # Quit game if player closes window
+    if event.type == pygame.QUIT:
+        return 'QUIT'
+    if event.type == pygame.KEYDOWN:
+        # moves up by pressing the "Up" key
+        if event.key == pygame.K_UP:
+            globals.PLAYER.creature.move(0, -1)
+            globals.FOV_CALCULATE = True
+            return 'player-moved'
+        # moves down by pressing the "Down" key
+        if event.key == pygame.K_DOWN:
+            globals.PLAYER.creature.move(0, 1)
+            globals.FOV_CALCULATE = True
+            return 'player-moved'
+        # moves left by pressing the "Left" key
+        if event.key == pygame.K_LEFT:
+            globals.PLAYER.creature.move(-1, 0)
+            globals.FOV_CALCULATE = True
+            return 'player-moved'
+        # moves right by pressing the "Right" key
+        if event.key == pygame.K_RIGHT:
+            globals.PLAYER.creature.move(1, 0)
+            globals.FOV_CALCULATE = True
+            return 'player-moved'
+        # Gets item from the ground by pressing the "g" key
+        if event.key == pygame.K_g:
+            objects_at_player = maps.objects_at_coordinates(globals.PLAYER.x, globals.PLAYER.y)
+            for obj in objects_at_player:
+                if obj.item:
+                    obj.item.pick_up(globals.PLAYER)
+        # Drops first item in the inventory onto the ground by pressing the "d" key
+        if event.key == pygame.K_d:
+            if len(globals.PLAYER.container.inventory) > 0:
+                globals.PLAYER.container.inventory[-1].item.drop(globals.PLAYER.x, globals.PLAYER.y)
+        # Pauses the game by pressing the "p" key
+        if event.key == pygame.K_p:
+            menu.pause()
+        # Opens the inventory menu by pressing the "i" key
+        if event.key == pygame.K_i:
+            menu.inventory()
+        # Open look menu by pressing the "l" key
+        if event.key == pygame.K_l:
+            menu.tile_select()
+        # Toggles the profiler overlay by pressing the "F3" key
+        if event.key == pygame.K_F3:
+            globals.PROFILER.toggle()
+        # Dumps the profiler frames to a trace file by pressing the "F4" key
+        if event.key == pygame.K_F4:
+            trace_file = globals.PROFILER.dump()
+            message(f'Profiler trace saved to {trace_file}', constants.COLOR_WHITE)
+        # Go down or up stairs by pressing "SHIT + ."
+        if mod_key and event.key == pygame.K_PERIOD:
+            objects_at_player = maps.objects_at_coordinates(globals.PLAYER.x, globals.PLAYER.y)
+            for obj in objects_at_player:
+                if obj.stairs:
+                    obj.stairs.use()
+                if obj.exit_portal:
+                    obj.exit_portal.use()
 
     return 'no-action'
 
 
 def message(message_to_display, color=constants.COLOR_GREY):
-    globals.GAME.message_history.append((message_to_display, color))
+    globals.GAME.message_log.append(message_to_display, color)
 
 
-def start(continue_game=True):
+def start(continue_game=True, seed=None, record_path=None):
+    """
+    Starts the game
+    :param continue_game: loads the saved game if True, starts a new game otherwise
+    :param seed: seed of a new game. A random seed is used if None.
+    :param record_path: if given, the input of a new game is recorded to this file so it can be replayed
+    """
 
     # starts the game
     if continue_game:
@@ -253,19 +364,73 @@ def start(continue_game=True):
             load()
             globals.FOV_CALCULATE = True
         except FileNotFoundError:
-            new()
+            new(seed)
             globals.FOV_CALCULATE = True
             print('Game not found')
     else:
-        new()
+        new(seed)
         globals.FOV_CALCULATE = True
-    main_loop()
 
+    # only new games can be replayed, saved games don't start from a seed
+    if record_path and globals.GAME.seed is not None:
+        globals.INPUT_RECORDER = events.InputRecorder(record_path, globals.GAME.seed)
+
+    try:
+        main_loop()
+    finally:
+        if globals.INPUT_RECORDER:
+            globals.INPUT_RECORDER.close()
+            globals.INPUT_RECORDER = None
+
+
+def replay(file_path):
+    """
+    Replays a recorded game as fast as possible. The replay uses a temporary save game and message log, so the
+    player's files are never touched.
+    :param file_path: recording written by start
+    """
+
+    globals.INPUT_REPLAY = events.InputReplay(file_path)
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        constants.SAVEGAME_PATH = os.path.join(temporary_directory, 'savegame')
+        constants.MESSAGE_LOG_PATH = os.path.join(temporary_directory, 'message_log')
+        constants.LEGACY_DIRECTORY = os.path.join(temporary_directory, 'legacy')
 
-def new():
+        start_time = time.perf_counter()
+
+        new(globals.INPUT_REPLAY.seed)
+        globals.FOV_CALCULATE = True
+
+        # the replay ends when the recording runs out, or with the recorded quit
+        try:
+            main_loop()
+        except (events.ReplayFinished, SystemExit):
+            pass
+
+        print(f'replayed {globals.INPUT_REPLAY.batches} input batches in {time.perf_counter() - start_time:.2f}s')
+        print(f'seed {globals.INPUT_REPLAY.seed}, player {globals.PLAYER.display_name} at '
+              f'({globals.PLAYER.x}, {globals.PLAYER.y}), state {globals.PLAYER.state}')
+
+    globals.INPUT_REPLAY = None
+
+
+def new(seed=None):
+    """
+    Creates a new game
+    :param seed: seed of the game. A random seed is used if None.
+    """
+
+    # layouts requested for the previous game are never taken
+    globals.LEVEL_GENERATOR.cancel()
+
+    # every random draw of the game comes from the seeded random service
+    globals.RANDOM_ENGINE = rng.RandomService(seed)
+    globals.NAME_POOL.reseed(globals.RANDOM_ENGINE)
 
     # Creates new GAME
     globals.GAME = ObjectGame()
+    globals.GAME.seed = globals.RANDOM_ENGINE.seed
 
     # initialize maps
     globals.GAME.current_map = maps.GameMap(constants.MAP_WIDTH, constants.MAP_HEIGHT)
@@ -280,26 +445,37 @@ def new():
                 constants.ROOM_MIN_HEIGHT, constants.ROOM_MAX_HEIGHT
             )
 
+    globals.GAME.prepare_next_level()
+
 
-def save():
+def save(file_path=None):
 
     for obj in globals.GAME.objects_on_map:
         obj.animation_destroy()
 
-    with gzip.open('data/savegame', 'wb') as file:
-        pickle.dump([globals.GAME, globals.PLAYER], file)
+    with gzip.open(file_path or constants.SAVEGAME_PATH, 'wb') as file:
+        pickle.dump([globals.GAME, globals.PLAYER, globals.RANDOM_ENGINE], file)
 
 
-def load():
+def load(file_path=None):
 
-    with gzip.open('data/savegame', 'rb') as file:
-        globals.GAME, globals.PLAYER = pickle.load(file)
+    # layouts requested for the previous game are never taken
+    globals.LEVEL_GENERATOR.cancel()
+
+    with gzip.open(file_path or constants.SAVEGAME_PATH, 'rb') as file:
+        globals.GAME, globals.PLAYER, globals.RANDOM_ENGINE = pickle.load(file)
+
+    # a loaded game is no longer reproducible from its seed
+    globals.GAME.seed = None
+    globals.NAME_POOL.reseed(globals.RANDOM_ENGINE)
 
     for obj in globals.GAME.objects_on_map:
         obj.animation = globals.ASSETS.sprite(obj.animation_key)
 
     # make FOV
-    maps.make_fov(globals.GAME.current_map)
+    globals.FOV_CALCULATE = True
+
+    globals.GAME.prepare_next_level()
 
 
 def preferences_save():
@@ -317,5 +493,7 @@ def preferences_load():
 def exit_game():
 
     save()
+    globals.LEVEL_GENERATOR.shutdown()
+    globals.NAME_POOL.shutdown()
     pygame.quit()
     sys.exit()
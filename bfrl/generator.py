@@ -1,7 +1,8 @@
 # modules
+import functools
 import numpy as np
-import random
-import tcod
+import sys
+import yaml
 
 # game files
 from bfrl import constants
@@ -22,7 +23,7 @@ def player(coordinates):
     globals.PLAYER = actors.ObjActor(x, y, 'Python', 'A_PLAYER',
                                      animation_speed=1, creature=creature_component,
                                      container=bag, depth=constants.DEPTH_PLAYER)
-    globals.GAME.current_map.list_of_objects.append(globals.PLAYER)
+    globals.GAME.current_map.add_object(globals.PLAYER)
 
     return globals.PLAYER
 
@@ -34,7 +35,10 @@ def portal(coordinates):
     obj_exit_portal = actors.ObjActor(x, y, 'Exit Portal', animation_key='S_PORTAL_CLOSED',
                                       exit_portal=exit_portal_component, depth=constants.DEPTH_STAIRS)
 
-    globals.GAME.current_map.list_of_objects.append(obj_exit_portal)
+    # the portal opens when the player picks up the lamp
+    globals.PLAYER.container.subscribe(exit_portal_component)
+
+    globals.GAME.current_map.add_object(obj_exit_portal)
 
 
 def lamp(coordinates):
@@ -43,7 +47,7 @@ def lamp(coordinates):
     item_component = actors.ComponentItem()
     obj_lamp = actors.ObjActor(x, y, 'The Lamp', animation_key='S_MAGIC_LAMP', item=item_component)
 
-    globals.GAME.current_map.list_of_objects.append(obj_lamp)
+    globals.GAME.current_map.add_object(obj_lamp)
 
 
 def stairs(coordinates, downwards=True):
@@ -58,33 +62,81 @@ def stairs(coordinates, downwards=True):
         obj_stairs = actors.ObjActor(x, y, 'stairs up', animation_key='S_STAIRS_UP',
                                      stairs=stairs_component, depth=constants.DEPTH_STAIRS)
 
-    globals.GAME.current_map.list_of_objects.append(obj_stairs)
+    globals.GAME.current_map.add_object(obj_stairs)
 
 
-# Items
-def item(coordinates):
-
-    generator_dict = {
-        1: scroll_lightning(coordinates),
-        2: scroll_fireball(coordinates),
-        3: scroll_confusion(coordinates),
-        4: weapon_sword(coordinates),
-        5: armor_shield(coordinates),
-    }
+# Spawn tables
+class SpawnTable:
+    """
+    A spawn table lists the factories an actor can be created with, how likely each one is, and the range of the
+    random attributes each factory takes.
 
-    # generate random item with equal probability
-    random_num = random.randint(1, len(generator_dict))
+    ** PROPERTIES **
+    SpawnTable.factories : list of factory functions.
+    SpawnTable.probabilities : numpy array with the probability of each factory.
+    SpawnTable.rolls : list of dictionaries of attribute name to (min, max) range, one per factory.
+    """
 
-    selected_item = generator_dict[random_num]
-    globals.GAME.current_map.list_of_objects.append(selected_item)
+    def __init__(self, entries):
+        """
+        :param entries: dictionary of factory name to {'weight': number, 'rolls': {attribute: [min, max]}}
+        """
 
+        this_module = sys.modules[__name__]
+        self.factories = [getattr(this_module, factory_name) for factory_name in entries]
 
-def scroll_lightning(coordinates):
+        weights = [entry['weight'] for entry in entries.values()]
+        self.probabilities = np.array(weights, dtype=float) / sum(weights)
 
-    x, y = coordinates
+        self.rolls = [entry.get('rolls', {}) for entry in entries.values()]
+
+
+@functools.cache
+def spawn_table(table_name):
+    """
+    Loads a spawn table from the spawn tables file. Tables are loaded once and cached.
+    :param table_name: name of the table, 'items' or 'enemies' for example
+    :return: SpawnTable
+    """
+
+    with open(constants.SPAWN_TABLES_PATH, 'r') as spawns_file:
+        return SpawnTable(yaml.safe_load(spawns_file)[table_name])
+
+
+def spawn_batch(table_name, coordinates):
+    """
+    Creates one actor per position, picked at random from a spawn table. The factories and their random
+    attributes are drawn for the whole batch at once, then the actors are built.
+    :param table_name: name of the spawn table, also used as the name of the random stream
+    :param coordinates: numpy array of shape (n, 2) with the (x, y) positions of the new actors
+    :return: list of new actors, in the same order as the positions
+    """
+
+    table = spawn_table(table_name)
+    random_stream = globals.RANDOM_ENGINE.numpy_stream(table_name)
+
+    number_of_actors = len(coordinates)
+    factory_indexes = random_stream.choice(len(table.factories), size=number_of_actors, p=table.probabilities)
+
+    # roll every attribute of every actor made by the same factory in one pass
+    attributes = [{} for _ in range(number_of_actors)]
+    for index, rolls in enumerate(table.rolls):
+        actor_indexes = np.flatnonzero(factory_indexes == index)
+        for name, (low, high) in rolls.items():
+            values = random_stream.integers(low, high, endpoint=True, size=len(actor_indexes))
+            for actor_index, value in zip(actor_indexes.tolist(), values.tolist()):
+                attributes[actor_index][name] = value
+
+    return [
+        table.factories[index](position, **actor_attributes)
+        for index, position, actor_attributes in zip(factory_indexes.tolist(), coordinates.tolist(), attributes)
+    ]
 
-    spell_damage = tcod.random_get_int(None, 5, 7)
-    spell_range = tcod.random_get_int(None, 7, 8)
+
+# Items
+def scroll_lightning(coordinates, spell_damage, spell_range):
+
+    x, y = coordinates
 
     item_component = actors.ComponentItem(use_function=magic.cast_lightning, value=(spell_damage, spell_range))
     scroll = actors.ObjActor(x, y, "Lightning scroll", 'S_SCROLL_01', item=item_component, depth=constants.DEPTH_ITEMS)
@@ -92,13 +144,11 @@ def scroll_lightning(coordinates):
     return scroll
 
 
-def scroll_fireball(coordinates):
+def scroll_fireball(coordinates, spell_damage, spell_range):
 
     x, y = coordinates
 
-    spell_damage = tcod.random_get_int(None, 2, 4)
     spell_radius = 1
-    spell_range = tcod.random_get_int(None, 9, 12)
 
     item_component = actors.ComponentItem(use_function=magic.cast_fireball,
                                           value=(spell_damage, spell_radius, spell_range))
@@ -107,66 +157,55 @@ def scroll_fireball(coordinates):
     return scroll
 
 
-def scroll_confusion(coordinates):
+def scroll_confusion(coordinates, effect_length):
 
     x, y = coordinates
 
-    effect_length = tcod.random_get_int(None, 5, 10)
-
     item_component = actors.ComponentItem(use_function=magic.cast_confusion, value=effect_length)
     scroll = actors.ObjActor(x, y, "Confusion scroll", 'S_SCROLL_03', item=item_component, depth=constants.DEPTH_ITEMS)
 
     return scroll
 
 
-def weapon_sword(coordinates):
+def weapon_sword(coordinates, bonus):
 
     x, y = coordinates
 
-    bonus = tcod.random_get_int(None, 1, 2)
-
     equipment_component = actors.ComponentEquipment(attack_bonus=bonus, slot='hand_right')
     sword = actors.ObjActor(x, y, "sword", 'S_SWORD', equipment=equipment_component, depth=constants.DEPTH_ITEMS)
 
     return sword
 
 
-def armor_shield(coordinates):
+def armor_shield(coordinates, bonus):
 
     x, y = coordinates
 
-    bonus = tcod.random_get_int(None, 1, 2)
-
     equipment_component = actors.ComponentEquipment(defense_bonus=bonus, slot='hand_left')
     shield = actors.ObjActor(x, y, "shield", 'S_SHIELD', equipment=equipment_component, depth=constants.DEPTH_ITEMS)
 
     return shield
 
 
-# Enemies
-def enemy(coordinates):
-
-    generator_dict = {
-        0: snake_anaconda(coordinates),
-        1: snake_cobra(coordinates),
-        2: mouse(coordinates),
-    }
-
-    # Generate Random Snake based on p probability weights
-    random_num = np.random.choice(len(generator_dict), p=[0.5, 0.15, 0.35])
+def creature_name(name_set):
+    """
+    Takes a creature name from the name pool, one that is not used yet on the map being populated.
+    :param name_set: name set of the name generator rules, 'Celtic male' for example
+    :return: name string
+    """
 
-    selected_enemy = generator_dict[random_num]
-    globals.GAME.current_map.list_of_objects.append(selected_enemy)
+    return globals.NAME_POOL.take(name_set, globals.GAME.current_map.creature_names)
 
 
-def snake_anaconda(coordinates):
+# Enemies
+def snake_anaconda(coordinates, base_attack, hp):
 
     x, y = coordinates
 
     creature_attributes = {
-        'name_instance': tcod.namegen_generate('Celtic female'),
-        'base_attack': tcod.random_get_int(None, 1, 2),
-        'hp': tcod.random_get_int(None, 5, 10),
+        'name_instance': creature_name('Celtic female'),
+        'base_attack': base_attack,
+        'hp': hp,
         'death_function': death.monster
     }
 
@@ -186,14 +225,14 @@ def snake_anaconda(coordinates):
     return anaconda
 
 
-def snake_cobra(coordinates):
+def snake_cobra(coordinates, base_attack, hp):
 
     x, y = coordinates
 
     creature_attributes = {
-        'name_instance': tcod.namegen_generate('Celtic male'),
-        'base_attack': tcod.random_get_int(None, 3, 6),
-        'hp': tcod.random_get_int(None, 15, 20),
+        'name_instance': creature_name('Celtic male'),
+        'base_attack': base_attack,
+        'hp': hp,
         'death_function': death.monster
     }
 
@@ -218,7 +257,7 @@ def mouse(coordinates):
     x, y = coordinates
 
     creature_attributes = {
-        'name_instance': tcod.namegen_generate('Celtic male'),
+        'name_instance': creature_name('Celtic male'),
         'base_attack': 0,
         'hp': 1,
         'death_function': death.mouse
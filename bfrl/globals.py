@@ -3,7 +3,8 @@ def init():
 
     global SURFACE_MAIN, SURFACE_MAP
     global CLOCK, FOV_CALCULATE, FOV_MAP, ASSETS, CAMERA, RANDOM_ENGINE
-    global PREFERENCES, GAME, PLAYER
+    global PREFERENCES, GAME, PLAYER, PROFILER, INPUT_RECORDER, INPUT_REPLAY, LEVEL_GENERATOR
+    global NAME_POOL
 
     SURFACE_MAIN = None
     SURFACE_MAP = None
@@ -16,3 +17,8 @@ def init():
     PREFERENCES = None
     GAME = None
     PLAYER = None
+    PROFILER = None
+    INPUT_RECORDER = None
+    INPUT_REPLAY = None
+    LEVEL_GENERATOR = None
+    NAME_POOL = None
@@ -0,0 +1,211 @@
+# modules
+import concurrent.futures
+import multiprocessing
+import numpy as np
+import tcod
+
+
+class LevelGenerator:
+    """
+    The level generator builds level layouts in a worker process, so a level can be ready before the player
+    reaches it. Layouts are identified by the arguments of generate_level, and generating them is deterministic,
+    so a layout taken from the worker is the same one that would have been generated on the spot.
+
+    ** PROPERTIES **
+    LevelGenerator.pending : dictionary of generate_level arguments to the future of its layout.
+
+    ** METHODS **
+    LevelGenerator.request : starts generating a layout in the worker process.
+    LevelGenerator.take : returns a layout, from the worker if it was requested, generated on the spot otherwise.
+    LevelGenerator.cancel : drops the pending layouts, for a game that ended before taking them.
+    LevelGenerator.shutdown : cancels the pending layouts and stops the worker process.
+    """
+
+    def __init__(self):
+
+        self.executor = None
+        self.pending = {}
+
+    def request(self, *arguments):
+        """
+        Starts generating a layout in the worker process, which is started on the first request.
+        :param arguments: arguments of generate_level
+        """
+
+        if arguments in self.pending:
+            return
+
+        if self.executor is None:
+            # spawned workers only import this module, not the pygame state of the game process
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn')
+            )
+
+        self.pending[arguments] = self.executor.submit(generate_level, *arguments)
+
+    def take(self, *arguments):
+        """
+        returns a layout, waiting for the worker if it is still being generated.
+        :param arguments: arguments of generate_level
+        :return: the layout returned by generate_level
+        """
+
+        future = self.pending.pop(arguments, None)
+        if future is None:
+            return generate_level(*arguments)
+
+        return future.result()
+
+    def cancel(self):
+
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def shutdown(self):
+
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+def generate_level(width, height, number_of_rooms, room_size, seed):
+    """
+    Generates everything about a level that does not depend on the game state, as compact arrays that are cheap to
+    send between processes.
+    :param width: map width in tiles
+    :param height: map height in tiles
+    :param number_of_rooms: exact number of rooms in the layout
+    :param room_size: (min width, max width, min height, max height) of the rooms
+    :param seed: seed of the numpy Generator the layout is drawn from
+    :return: rooms, walls and tile assignments, as returned by generate and assign_tiles
+    """
+
+    rooms, walls = generate(width, height, number_of_rooms, room_size, np.random.default_rng(seed))
+    return rooms, walls, assign_tiles(walls)
+
+
+def generate(width, height, number_of_rooms, room_size, random_stream):
+    """
+    Generates a dungeon layout. The usable area of the map is split in a grid of cells big enough to hold the
+    largest room plus a wall, and every room is placed at a random offset inside its own randomly picked cell, so
+    rooms never overlap and no placement is ever rejected. Rooms are chained in a serpentine order over the grid and
+    every room is joined to the previous one by a tunnel, so the whole dungeon is connected.
+    :param width: map width in tiles
+    :param height: map height in tiles
+    :param number_of_rooms: exact number of rooms in the layout
+    :param room_size: (min width, max width, min height, max height) of the rooms
+    :param random_stream: numpy Generator the layout is drawn from
+    :return: rooms, numpy array of shape (n, 4) with (x1, y1, x2, y2) per room, and walls, boolean numpy array of
+    shape (width, height) that is True on wall tiles
+    """
+
+    room_min_width, room_max_width, room_min_height, room_max_height = room_size
+
+    # rooms are kept two tiles away from the map edges
+    cell_width = room_max_width + 1
+    cell_height = room_max_height + 1
+    columns = max((width - 3) // cell_width, 0)
+    rows = max((height - 3) // cell_height, 0)
+
+    if not 1 <= number_of_rooms <= columns * rows:
+        raise ValueError(f'a {width}x{height} map holds between 1 and {columns * rows} rooms, not {number_of_rooms}')
+
+    cells = random_stream.choice(columns * rows, number_of_rooms, replace=False)
+    row, column = np.divmod(cells, columns)
+
+    # serpentine order keeps the tunnels between consecutive rooms short
+    order = np.lexsort((np.where(row % 2 == 0, column, -column), row))
+    row, column = row[order], column[order]
+
+    room_widths = random_stream.integers(room_min_width, room_max_width, number_of_rooms, endpoint=True)
+    room_heights = random_stream.integers(room_min_height, room_max_height, number_of_rooms, endpoint=True)
+
+    x1 = 2 + column * cell_width + random_stream.integers(0, cell_width - room_widths)
+    y1 = 2 + row * cell_height + random_stream.integers(0, cell_height - room_heights)
+    rooms = np.stack([x1, y1, x1 + room_widths, y1 + room_heights], axis=1)
+
+    walls = np.ones((width, height), dtype=bool)
+    for room_x1, room_y1, room_x2, room_y2 in rooms.tolist():
+        walls[room_x1:room_x2, room_y1:room_y2] = False
+
+    centers = room_centers(rooms)
+    horizontal_first = random_stream.random(number_of_rooms - 1) < 0.5
+    for (x1, y1), (x2, y2), horizontal in zip(centers[1:].tolist(), centers[:-1].tolist(), horizontal_first.tolist()):
+        carve_tunnel(walls, (x1, y1), (x2, y2), horizontal)
+
+    return rooms, walls
+
+
+def room_centers(rooms):
+    """
+    returns the center tile of each room.
+    :param rooms: numpy array of shape (n, 4) with (x1, y1, x2, y2) per room
+    :return: numpy array of shape (n, 2) with (x, y) per room
+    """
+
+    return np.stack([(rooms[:, 0] + rooms[:, 2]) // 2, (rooms[:, 1] + rooms[:, 3]) // 2], axis=1)
+
+
+def carve_tunnel(walls, origin, destination, horizontal_first):
+    """
+    Carves an L shaped tunnel between two tiles.
+    :param walls: boolean numpy array of the map, True on wall tiles
+    :param origin: (x, y) of the first tile
+    :param destination: (x, y) of the second tile
+    :param horizontal_first: True to carve the horizontal leg from the origin, False to carve the vertical one
+    """
+
+    x1, y1 = origin
+    x2, y2 = destination
+
+    if horizontal_first:
+        walls[min(x1, x2):max(x1, x2) + 1, y1] = False
+        walls[x2, min(y1, y2):max(y1, y2) + 1] = False
+    else:
+        walls[x1, min(y1, y2):max(y1, y2) + 1] = False
+        walls[min(x1, x2):max(x1, x2) + 1, y2] = False
+
+
+def assign_tiles(walls):
+    """
+    Picks the sprite of every tile. Floor tiles get 999 and walls surrounded by walls get 998. Walls next to a
+    floor are edges, and get a 4 bit mask of their edge neighbours: 1 for y - 1, 2 for x + 1, 4 for y + 1 and 8
+    for x - 1. Tiles outside the map count as walls that are not edges.
+    :param walls: boolean numpy array of the map, True on wall tiles
+    :return: integer numpy array of the map with the assignment of each tile
+    """
+
+    width, height = walls.shape
+
+    padded_walls = np.pad(walls, 1, constant_values=True)
+    surrounded = np.ones_like(walls)
+    for dx in range(3):
+        for dy in range(3):
+            surrounded &= padded_walls[dx:dx + width, dy:dy + height]
+
+    edges = np.pad(walls & ~surrounded, 1, constant_values=False)
+    edge_mask = (
+        edges[1:-1, :-2] * 1 +
+        edges[2:, 1:-1] * 2 +
+        edges[1:-1, 2:] * 4 +
+        edges[:-2, 1:-1] * 8
+    )
+
+    return np.where(walls, np.where(surrounded, 998, edge_mask), 999)
+
+
+def reachable(walls, origin):
+    """
+    Finds the floor tiles that can be reached from a tile, walking in the four cardinal directions.
+    :param walls: boolean numpy array of the map, True on wall tiles
+    :param origin: (x, y) of the starting tile
+    :return: boolean numpy array of the map, True on reachable tiles
+    """
+
+    distance = tcod.path.maxarray(walls.shape, dtype=np.int32)
+    distance[origin] = 0
+    tcod.path.dijkstra2d(distance, (~walls).astype(np.int8), 1, 0, out=distance)
+
+    return distance != np.iinfo(np.int32).max
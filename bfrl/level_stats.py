@@ -0,0 +1,117 @@
+# modules
+import argparse
+import concurrent.futures
+import functools
+import os
+import sys
+import time
+
+import numpy as np
+
+# game files
+from bfrl import constants
+from bfrl import layout
+from bfrl import rng
+
+
+DEFAULT_OUTPUT = 'data/levels/stats.npz'
+
+# columns of the stats file, and their types
+COLUMNS = {
+    'seed': np.int64,
+    'rooms': np.int32,
+    'walkable_ratio': np.float32,
+    'reachable_ratio': np.float32,
+    'connected': bool,
+    'generation_time': np.float64,
+}
+
+
+def measure(seed, level, width, height, number_of_rooms, room_size):
+    """
+    Generates the layout a game with a given seed has on a given level, and measures it.
+    :param seed: game seed
+    :param level: level number, starting at 1
+    :return: dictionary of column name to value
+    """
+
+    start = time.perf_counter()
+    rooms, walls, _ = layout.generate_level(
+        width, height, number_of_rooms, room_size, rng.RandomService(seed).numpy_seed(f'layout-{level}')
+    )
+    generation_time = time.perf_counter() - start
+
+    floor_tiles = np.count_nonzero(~walls)
+    origin = tuple(layout.room_centers(rooms)[0])
+    reachable_tiles = np.count_nonzero(layout.reachable(walls, origin))
+
+    return {
+        'seed': seed,
+        'rooms': len(rooms),
+        'walkable_ratio': floor_tiles / walls.size,
+        'reachable_ratio': reachable_tiles / floor_tiles,
+        'connected': reachable_tiles == floor_tiles,
+        'generation_time': generation_time,
+    }
+
+
+def run(seeds, level, width, height, number_of_rooms, room_size, workers=None):
+    """
+    Measures the levels of many seeds, spread across a pool of worker processes.
+    :param seeds: iterable of game seeds
+    :param workers: number of worker processes. Uses one per core if None.
+    :return: dictionary of column name to numpy array, one entry per seed
+    """
+
+    seeds = list(seeds)
+    workers = workers or os.cpu_count()
+    task = functools.partial(
+        measure, level=level, width=width, height=height, number_of_rooms=number_of_rooms, room_size=room_size
+    )
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        chunk_size = max(len(seeds) // (4 * workers), 1)
+        rows = list(executor.map(task, seeds, chunksize=chunk_size))
+
+    return {name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def report(stats, elapsed):
+
+    levels = len(stats['seed'])
+    print(f'{levels} levels in {elapsed:.2f}s, {levels / elapsed:.1f} levels/s')
+    print(f"rooms            {stats['rooms'].mean():10.2f}")
+    print(f"walkable ratio   {stats['walkable_ratio'].mean():10.3f}")
+    print(f"reachable ratio  {stats['reachable_ratio'].mean():10.3f}")
+    print(f"connected        {np.count_nonzero(stats['connected']):10d} / {levels}")
+    print(f"generation time  {np.median(stats['generation_time']) * 1000:10.3f} ms median")
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Generates many dungeon levels in parallel and measures them.')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='numpy .npz file the stats columns are written to')
+    parser.add_argument('--levels', type=int, default=1000, help='number of levels to generate')
+    parser.add_argument('--first-seed', type=int, default=0, help='game seed of the first level')
+    parser.add_argument('--level', type=int, default=1, help='level number generated for every seed')
+    parser.add_argument('--width', type=int, default=constants.MAP_WIDTH, help='map width in tiles')
+    parser.add_argument('--height', type=int, default=constants.MAP_HEIGHT, help='map height in tiles')
+    parser.add_argument('--rooms', type=int, default=constants.MAP_MAX_NUM_ROOMS, help='rooms per level')
+    parser.add_argument('--workers', type=int, help='worker processes, one per core by default')
+    args = parser.parse_args(argv)
+
+    room_size = (constants.ROOM_MIN_WIDTH, constants.ROOM_MAX_WIDTH, constants.ROOM_MIN_HEIGHT, constants.ROOM_MAX_HEIGHT)
+    seeds = range(args.first_seed, args.first_seed + args.levels)
+
+    start = time.perf_counter()
+    stats = run(seeds, args.level, args.width, args.height, args.rooms, room_size, args.workers)
+    report(stats, time.perf_counter() - start)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    np.savez(args.output, **stats)
+
+    return 0 if stats['connected'].all() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,10 @@
 # game files
 from bfrl import ai
+from bfrl import area
 from bfrl import constants
 from bfrl import game
 from bfrl import globals
 from bfrl import menu
-from bfrl import maps
 
 
 def cast_heal(caster, value):
@@ -33,16 +33,10 @@ def cast_lightning(caster, value):
     origin_tile = (caster.x, caster.y)
     target_tile = menu.tile_select(origin_tile, max_range=spell_range, ignore_walls=False)
 
-    # convert that tile into a list of tiles between player and target
+    # damage all creatures on the line between player and target
     if target_tile:
-        list_of_tiles = maps.find_line(origin_tile, target_tile)
-
-        # cycle through list, damage all creatures for value
-        for x, y in list_of_tiles[1:]:
-            target = globals.GAME.current_map.check_for_creature(x, y)
-            if target:
-                game.message(f'{target.display_name} is hit by a lightning bolt and takes {spell_range} damage!')
-                target.creature.take_damage(spell_range)
+        targets = area.affected(globals.GAME.current_map, area.Line(origin_tile, target_tile), exclude=caster)
+        area.damage(targets, spell_range, 'a lightning bolt')
     else:
         print('cast lightning cancelled.')
 
@@ -54,18 +48,12 @@ def cast_fireball(caster, value):
     # Get target tile
     origin_tile = (caster.x, caster.y)
     target_tile = menu.tile_select(origin_tile, max_range=spell_range, ignore_walls=False, ignore_creatures=False,
-                                   radius=spell_radius)
+                                   area_of_effect=lambda tile: area.Circle(tile, spell_radius))
 
-    # get sequence of tiles
+    # damage all creatures caught in the blast, walls shelter the creatures behind them
     if target_tile:
-        list_of_tiles = maps.find_radius(target_tile, spell_radius)
-
-        # damage all creatures in tiles
-        for x, y in list_of_tiles:
-            target = globals.GAME.current_map.check_for_creature(x, y)
-            if target:
-                game.message(f'{target.display_name} is hit by a fireball and takes {spell_damage} damage!')
-                target.creature.take_damage(spell_damage)
+        targets = area.affected(globals.GAME.current_map, area.Circle(target_tile, spell_radius))
+        area.damage(targets, spell_damage, 'a fireball')
     else:
         print('cast lightning cancelled.')
 
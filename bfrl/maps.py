@@ -1,12 +1,20 @@
 # modules
-import random
+import functools
+import numpy as np
 import tcod
 
 # game files
+from bfrl import actors
+from bfrl import chunks
 from bfrl import constants
-from bfrl import data
 from bfrl import generator
 from bfrl import globals
+from bfrl import layout
+
+
+# properties of a map tile: wall is True if the tile blocks movement and sight, assignment picks the wall sprite,
+# explored is True once the player has seen the tile, and occupant is the id of the creature standing on it, or -1
+TILE_DTYPE = np.dtype([('wall', bool), ('assignment', np.int16), ('explored', bool), ('occupant', np.int32)])
 
 
 class GameMap:
@@ -16,64 +24,43 @@ class GameMap:
         self.map_width = map_width
         self.map_height = map_height
 
-        self.map_tiles = [
-            [data.Tile(True) for _ in range(0, constants.MAP_HEIGHT)] for _ in range(0, constants.MAP_WIDTH)
-        ]
+        # tiles are stored in chunks, only the chunks around the player have to stay in memory
+        self.tiles = chunks.ChunkedGrid(
+            (map_width, map_height), constants.MAP_CHUNK_SIZE, TILE_DTYPE, (True, 998, False, -1)
+        )
 
         self.list_of_rooms = []
         self.list_of_objects = []
 
-    def generate_dungeon(self, number_of_rooms, room_min_width, room_max_width, room_min_height, room_max_height):
-
-        for room in range(number_of_rooms):
+        # actors on the map that have a component, by component name. Dictionaries keep the actors in the order they
+        # were added, so systems that walk a registry act in the same order as the object list.
+        self.registries = {name: {} for name in actors.ObjActor.COMPONENTS}
 
-            w = tcod.random_get_int(None, room_min_width, room_max_width)
-            h = tcod.random_get_int(None, room_min_height, room_max_height)
+        # creatures standing on the map by occupant id, the occupancy of a tile is stored in the tile
+        self.occupants = {}
+        self.next_occupant_id = 0
 
-            x = tcod.random_get_int(None, 2, self.map_width - w - 2)
-            y = tcod.random_get_int(None, 2, self.map_height - h - 2)
+        # names given to the creatures spawned on the map, so no two of them share a name
+        self.creature_names = set()
 
-            new_room = ObjectRoom((x, y), (w, h))
-
-            # Check for interference
-            failed = False
-            for other_room in self.list_of_rooms:
-                if new_room.intercept(other_room):
-                    failed = True
+    def generate_dungeon(self, number_of_rooms, room_min_width, room_max_width, room_min_height, room_max_height):
 
-            # Place the room
-            if not failed:
-                self.create_room(new_room)
-                if len(self.list_of_rooms) != 0:
-                    other_room = self.list_of_rooms[-1]
-                    self.create_tunnel(new_room.center, other_room.center)
+        # the layout may already have been generated by the level generator worker
+        rooms, walls, assignments = globals.LEVEL_GENERATOR.take(*layout_arguments(
+            globals.GAME.level, self.map_width, self.map_height, number_of_rooms,
+            (room_min_width, room_max_width, room_min_height, room_max_height)
+        ))
 
-                self.list_of_rooms.append(new_room)
+        self.list_of_rooms = [ObjectRoom((x1, y1), (x2 - x1, y2 - y1)) for x1, y1, x2, y2 in rooms.tolist()]
+        self.tiles.write_region(0, 0, walls, 'wall')
+        self.tiles.write_region(0, 0, assignments, 'assignment')
 
-        self.assign_tiles()
-        make_fov(self.map_tiles)
         self.place_objects()
 
-    def create_room(self, new_room):
-        for x in range(new_room.x1, new_room.x2):
-            for y in range(new_room.y1, new_room.y2):
-                self.map_tiles[x][y].block_path = False
-
-    def create_tunnel(self, room1, room2):
-
-        x1, y1 = room1
-        x2, y2 = room2
-
-        if random.choice([True, False]):
-            for x in range(min(x1, x2), max(x1, x2) + 1):
-                self.map_tiles[x][y1].block_path = False
-            for y in range(min(y1, y2), max(y1, y2) + 1):
-                self.map_tiles[x2][y].block_path = False
-        else:
-            for y in range(min(y1, y2), max(y1, y2) + 1):
-                self.map_tiles[x1][y].block_path = False
-            for x in range(min(x1, x2), max(x1, x2) + 1):
-                self.map_tiles[x][y2].block_path = False
+    @property
+    def walls(self):
+        """boolean numpy array of the whole map, True on wall tiles"""
+        return self.tiles.region(0, 0, self.map_width, self.map_height)['wall']
 
     def check_for_wall(self, x, y):
         """
@@ -83,86 +70,84 @@ class GameMap:
         :return: True if wall
         """
 
-        try:
-            return self.map_tiles[x][y].block_path
-        except IndexError:
+        if not (0 <= x < self.map_width and 0 <= y < self.map_height):
             return True
 
-    def assign_tiles(self):
+        return bool(self.tiles.get(x, y)['wall'])
 
-        for x in range(len(self.map_tiles)):
-            for y in range(len(self.map_tiles[0])):
-
-                if self.check_for_wall(x, y):
-
-                    pos_w = self.check_for_wall(x - 1, y)
-                    pos_e = self.check_for_wall(x + 1, y)
-                    pos_n = self.check_for_wall(x, y + 1)
-                    pos_s = self.check_for_wall(x, y - 1)
-                    pos_nw = self.check_for_wall(x - 1, y - 1)
-                    pos_sw = self.check_for_wall(x - 1, y + 1)
-                    pos_ne = self.check_for_wall(x + 1, y - 1)
-                    pos_se = self.check_for_wall(x + 1, y + 1)
-
-                    if pos_w & pos_e & pos_n & pos_s & pos_nw & pos_sw & pos_ne & pos_se:
-                        self.map_tiles[x][y].assignment = 998
-                    else:
-                        self.map_tiles[x][y].assignment = 0
-
-                else:
-                    self.map_tiles[x][y].assignment = 999
-
-        for x in range(len(self.map_tiles)):
-            for y in range(len(self.map_tiles[0])):
-
-                if self.map_tiles[x][y].assignment == 0:
-
-                    tile_assignment = 0
-                    if y - 1 >= 0:
-                        if self.map_tiles[x][y - 1].assignment <= 99:
-                            tile_assignment += 1
-                    if x + 1 < len(self.map_tiles):
-                        if self.map_tiles[x + 1][y].assignment <= 99:
-                            tile_assignment += 2
-                    if y + 1 < len(self.map_tiles[0]):
-                        if self.map_tiles[x][y + 1].assignment <= 99:
-                            tile_assignment += 4
-                    if x - 1 >= 0:
-                        if self.map_tiles[x - 1][y].assignment <= 99:
-                            tile_assignment += 8
-
-                    self.map_tiles[x][y].assignment = tile_assignment
+    def assign_tiles(self):
+        self.tiles.write_region(0, 0, layout.assign_tiles(self.walls), 'assignment')
 
     def place_objects(self):
 
-        current_level = len(globals.GAME.maps_previous) + 1
-        first_level = (current_level == 1)
-        final_level = (current_level == constants.MAP_LEVELS)
-
-        rooms = len(self.list_of_rooms) - 1
-        for room_number, room in enumerate(self.list_of_rooms):
-            if room_number == 0:
-                globals.PLAYER.set_position(room.center)
-                if first_level:
-                    generator.portal(room.center)
-                else:
-                    generator.stairs(room.center, downwards=False)
-                continue
-            elif room_number == rooms:
-                if final_level:
-                    generator.lamp(room.center)
-                else:
-                    generator.stairs(room.center)
-
-            # Place a random enemy
-            x = random.randint(room.x1 + 1, room.x2 - 1)
-            y = random.randint(room.y1 + 1, room.y2 - 1)
-            generator.enemy((x, y))
-
-            # Place a random item
-            x = random.randint(room.x1 + 1, room.x2 - 1)
-            y = random.randint(room.y1 + 1, room.y2 - 1)
-            generator.item((x, y))
+        first_level = (globals.GAME.level == 1)
+        final_level = (globals.GAME.level == constants.MAP_LEVELS)
+
+        first_room = self.list_of_rooms[0]
+        last_room = self.list_of_rooms[-1]
+
+        self.place_occupant(globals.PLAYER, first_room.center)
+        if first_level:
+            generator.portal(first_room.center)
+        else:
+            generator.stairs(first_room.center, downwards=False)
+
+        if len(self.list_of_rooms) > 1:
+            if final_level:
+                generator.lamp(last_room.center)
+            else:
+                generator.stairs(last_room.center)
+
+        # every room but the first gets a random enemy and a random item, spawned in batches
+        occupied = self.walls
+        for obj in self.list_of_objects:
+            occupied[obj.x, obj.y] = True
+
+        spawn_rooms = self.list_of_rooms[1:]
+        enemy_positions = self.spawn_positions(spawn_rooms, occupied)
+        item_positions = self.spawn_positions(spawn_rooms, occupied)
+
+        for obj in generator.spawn_batch('enemies', enemy_positions) + generator.spawn_batch('items', item_positions):
+            self.add_object(obj)
+
+    def spawn_positions(self, rooms, occupied):
+        """
+        Draws one random position inside each room, away from the room edges. Positions on occupied tiles are drawn
+        again, up to SPAWN_ATTEMPTS times, then the room is skipped.
+        :param rooms: list of rooms
+        :param occupied: boolean numpy array of the map size, True on walls and on tiles that are already taken.
+        Updated with the new positions.
+        :return: numpy array of shape (n, 2) with the (x, y) positions found
+        """
+
+        random_stream = globals.RANDOM_ENGINE.numpy_stream('maps')
+
+        x_min = np.array([room.x1 + 1 for room in rooms], dtype=int)
+        x_max = np.array([room.x2 for room in rooms], dtype=int)
+        y_min = np.array([room.y1 + 1 for room in rooms], dtype=int)
+        y_max = np.array([room.y2 for room in rooms], dtype=int)
+
+        positions = np.full((len(rooms), 2), -1, dtype=int)
+        pending = np.arange(len(rooms))
+        for _ in range(constants.SPAWN_ATTEMPTS):
+            if pending.size == 0:
+                break
+
+            xs = random_stream.integers(x_min[pending], x_max[pending])
+            ys = random_stream.integers(y_min[pending], y_max[pending])
+
+            # keep free candidates, and only the first one when several rooms drew the same tile
+            candidates = np.flatnonzero(~occupied[xs, ys])
+            _, first_candidates = np.unique(xs[candidates] * self.map_height + ys[candidates], return_index=True)
+            accepted = candidates[first_candidates]
+
+            positions[pending[accepted], 0] = xs[accepted]
+            positions[pending[accepted], 1] = ys[accepted]
+            occupied[xs[accepted], ys[accepted]] = True
+
+            pending = np.delete(pending, accepted)
+
+        return positions[positions[:, 0] >= 0]
 
     def check_for_creature(self, x, y, exclude_object=None):
         """
@@ -173,18 +158,117 @@ class GameMap:
         :return: creature owner object on tile. None if no creature on tile.
         """
 
-        target = None
-        if exclude_object:
-            for obj in self.list_of_objects:
-                if obj is not exclude_object and obj.x == x and obj.y == y and obj.creature:
-                    target = obj
-        else:
-            for obj in globals.GAME.objects_on_map:
-                if obj.x == x and obj.y == y and obj.creature:
-                    target = obj
+        if not (0 <= x < self.map_width and 0 <= y < self.map_height):
+            return None
+
+        target = self.occupants.get(int(self.tiles.get(x, y)['occupant']))
+        if target is exclude_object:
+            return None
 
         return target
 
+    def add_object(self, obj):
+        """
+        Adds an object to the map. Creatures also occupy their tile.
+        :param obj: actor to be added
+        """
+
+        self.list_of_objects.append(obj)
+        self.enter(obj)
+        if obj.creature:
+            self.place_occupant(obj, (obj.x, obj.y))
+
+    def remove_object(self, obj):
+
+        self.list_of_objects.remove(obj)
+        self.remove_occupant(obj)
+
+        obj.game_map = None
+        for registry in self.registries.values():
+            registry.pop(obj, None)
+
+    def enter(self, obj):
+        """
+        Makes the map track the components of an actor already in its object list, such as the player coming back to
+        a level it visited.
+        :param obj: actor on the map
+        """
+
+        obj.game_map = self
+        for name in self.registries:
+            self.register(obj, name)
+
+    def register(self, obj, name):
+        """
+        Adds an actor to the registry of a component, or removes it if the actor no longer has that component.
+        :param obj: actor on the map
+        :param name: component name, 'ai' or 'exit_portal' for example
+        """
+
+        if getattr(obj, name) is not None:
+            self.registries[name].setdefault(obj, None)
+        else:
+            self.registries[name].pop(obj, None)
+
+    def with_component(self, name):
+        """
+        returns the actors on the map that have a component.
+        :param name: component name, 'ai' or 'exit_portal' for example
+        :return: list of actors, in the order they were added to the map
+        """
+
+        return list(self.registries[name])
+
+    def place_occupant(self, creature, coordinates):
+        """
+        Moves a creature to a tile, and updates the occupancy of the tile it leaves and of the tile it enters.
+        :param creature: actor with a creature component
+        :param coordinates: (x, y) of the new tile. Raises ValueError if another creature stands on it.
+        """
+
+        occupant_id = self.occupant_id(creature)
+
+        tile_occupant_id = int(self.tiles.get(*coordinates)['occupant'])
+        if tile_occupant_id >= 0 and tile_occupant_id != occupant_id:
+            raise ValueError(f'{coordinates} is occupied by {self.occupants[tile_occupant_id].display_name}')
+
+        if occupant_id is None:
+            occupant_id = self.next_occupant_id
+            self.next_occupant_id += 1
+            self.occupants[occupant_id] = creature
+        else:
+            self.tiles.set(creature.x, creature.y, -1, 'occupant')
+
+        creature.set_position(coordinates)
+        self.tiles.set(creature.x, creature.y, occupant_id, 'occupant')
+
+    def remove_occupant(self, creature):
+        """
+        Frees the tile of a creature that died or left the map. Does nothing if the creature is not an occupant.
+        :param creature: actor that occupied a tile
+        """
+
+        occupant_id = self.occupant_id(creature)
+        if occupant_id is not None:
+            del self.occupants[occupant_id]
+            self.tiles.set(creature.x, creature.y, -1, 'occupant')
+
+    def occupant_id(self, creature):
+        """
+        returns the occupant id of a creature, read from the tile it stands on.
+        :param creature: actor with a creature component
+        :return: occupant id, None if the creature does not occupy its tile on this map
+        """
+
+        if not (0 <= creature.x < self.map_width and 0 <= creature.y < self.map_height):
+            return None
+
+        occupant_id = int(self.tiles.get(creature.x, creature.y)['occupant'])
+        if self.occupants.get(occupant_id) is not creature:
+            return None
+
+        return occupant_id
+
 
 class ObjectRoom:
     """
@@ -204,12 +288,6 @@ class ObjectRoom:
         center_y = int((self.y1 + self.y2)/2)
         return center_x, center_y
 
-    def intercept(self, other):
-
-        x_overlap = self.x1 <= other.x2 and self.x2 >= other.x1
-        y_overlap = self.y1 <= other.y2 and self.y2 >= other.y1
-        return x_overlap and y_overlap
-
 
 class Node:
 
@@ -239,26 +317,110 @@ class Node:
         return self.position == other.position
 
 
-def make_fov(incoming_map):
+def layout_arguments(level, map_width, map_height, number_of_rooms, room_size):
+    """
+    returns the arguments of layout.generate_level for a level of the current game. Every level has its own random
+    stream, so its layout does not depend on when or where it is generated.
+    """
+
+    return map_width, map_height, number_of_rooms, room_size, globals.RANDOM_ENGINE.numpy_seed(f'layout-{level}')
 
-    globals.FOV_MAP = tcod.map.Map(constants.MAP_WIDTH, constants.MAP_HEIGHT)
 
-    for y in range(constants.MAP_HEIGHT):
-        for x in range(constants.MAP_WIDTH):
-            if incoming_map[x][y].block_path:
-                globals.FOV_MAP.transparent[y, x] = False
-                globals.FOV_MAP.walkable[y, x] = False
-            else:
-                globals.FOV_MAP.transparent[y, x] = True
-                globals.FOV_MAP.walkable[y, x] = True
+class FieldOfView:
+    """
+    The field of view tracks the tiles the player can see. It is computed on the window of the map within the torch
+    radius, so its cost does not depend on the size of the map.
+
+    ** PROPERTIES **
+    FieldOfView.origin : (x, y) of the top left tile of the window.
+    FieldOfView.visible_tiles : boolean numpy array of the window, True on visible tiles.
+
+    ** METHODS **
+    FieldOfView.compute : computes the tiles visible from a tile, and marks them as explored.
+    FieldOfView.is_visible : checks if a tile is visible.
+    FieldOfView.visible_at : checks if many tiles are visible at once.
+    FieldOfView.region : returns the visibility of a rectangle of the map.
+    """
+
+    def __init__(self):
+
+        self.origin = (0, 0)
+        self.visible_tiles = np.zeros((0, 0), dtype=bool)
+
+    def compute(self, game_map, x, y, radius):
+        """
+        Computes the tiles visible from a tile.
+        :param game_map: map the tile is on
+        :param x: tile x coordinate
+        :param y: tile y coordinate
+        :param radius: maximum sight distance in tiles
+        """
+
+        x_min, y_min = max(x - radius, 0), max(y - radius, 0)
+        x_max, y_max = min(x + radius + 1, game_map.map_width), min(y + radius + 1, game_map.map_height)
+
+        window = game_map.tiles.region(x_min, y_min, x_max, y_max)
+        self.visible_tiles = tcod.map.compute_fov(
+            ~window['wall'], (x - x_min, y - y_min), radius, constants.FOV_LIGHT_WALLS, constants.FOV_ALGORITHM
+        )
+        self.origin = (x_min, y_min)
+
+        game_map.tiles.write_region(x_min, y_min, window['explored'] | self.visible_tiles, 'explored')
+
+    def is_visible(self, x, y):
+
+        window_x, window_y = x - self.origin[0], y - self.origin[1]
+        window_width, window_height = self.visible_tiles.shape
+
+        return 0 <= window_x < window_width and 0 <= window_y < window_height and self.visible_tiles[window_x, window_y]
+
+    def visible_at(self, xs, ys):
+        """
+        Checks if many tiles are visible at once.
+        :param xs: numpy array of tile x coordinates
+        :param ys: numpy array of tile y coordinates
+        :return: boolean numpy array, True for visible tiles
+        """
+
+        window_xs, window_ys = xs - self.origin[0], ys - self.origin[1]
+        window_width, window_height = self.visible_tiles.shape
+
+        inside = (0 <= window_xs) & (window_xs < window_width) & (0 <= window_ys) & (window_ys < window_height)
+        visible = np.zeros(inside.shape, dtype=bool)
+        visible[inside] = self.visible_tiles[window_xs[inside], window_ys[inside]]
+
+        return visible
+
+    def region(self, x_min, y_min, x_max, y_max):
+        """
+        returns the visibility of a rectangle of the map.
+        :return: boolean numpy array of shape (x_max - x_min, y_max - y_min), True on visible tiles
+        """
+
+        result = np.zeros((x_max - x_min, y_max - y_min), dtype=bool)
+
+        origin_x, origin_y = self.origin
+        window_width, window_height = self.visible_tiles.shape
+        left, top = max(x_min, origin_x), max(y_min, origin_y)
+        right, bottom = min(x_max, origin_x + window_width), min(y_max, origin_y + window_height)
+
+        if left < right and top < bottom:
+            visible_tiles = self.visible_tiles[left - origin_x:right - origin_x, top - origin_y:bottom - origin_y]
+            result[left - x_min:right - x_min, top - y_min:bottom - y_min] = visible_tiles
+
+        return result
 
 
 def calculate_fov():
 
     if globals.FOV_CALCULATE:
         globals.FOV_CALCULATE = False
-        globals.FOV_MAP.compute_fov(globals.PLAYER.x, globals.PLAYER.y, constants.TORCH_RADIUS,
-                                    constants.FOV_LIGHT_WALLS, constants.FOV_ALGORITHM)
+
+        game_map = globals.GAME.current_map
+        globals.FOV_MAP.compute(game_map, globals.PLAYER.x, globals.PLAYER.y, constants.TORCH_RADIUS)
+
+        # the rest of the map waits on disk until the player gets close
+        game_map.tiles.evict_outside(globals.PLAYER.x, globals.PLAYER.y, constants.MAP_CHUNK_RADIUS)
 
 
 def objects_at_coordinates(x, y):
@@ -267,33 +429,63 @@ def objects_at_coordinates(x, y):
     return object_options
 
 
-def find_line(origin_coordinates, destination_coordinates):
+def find_line(origin_coordinates, destination_coordinates, as_array=False):
     """
     Converts two coordinates into a list of titles.
     :param origin_coordinates: (x1, y1)
     :param destination_coordinates: (x2, y2)
+    :param as_array: True to get a numpy array of shape (n, 2) instead of a list of tuples
     :return: list of coordinates between coordinates 1 and coordinates 2.
     """
 
     x1, y1 = origin_coordinates
     x2, y2 = destination_coordinates
 
-    coordinate_list = list(tcod.line_iter(x1, y1, x2, y2))
-    return coordinate_list
+    coordinates = line_template(x2 - x1, y2 - y1) + (x1, y1)
+    return coordinates if as_array else list(map(tuple, coordinates.tolist()))
 
 
-def find_radius(coordinates, radius):
+def find_radius(coordinates, radius, as_array=False):
     """
-    Returns all tiles within a radius of a center tile
+    Returns all tiles within a radius of a center tile. Tiles count as inside when dx² + dy² <= radius * (radius + 1),
+    which rounds the circle out so a radius of 1 covers the 3x3 block around the center.
     :param coordinates: center tile (x, y) tuple
     :param radius: radius length
+    :param as_array: True to get a numpy array of shape (n, 2) instead of a list of tuples
     :return: list of tiles within radius of center tile
     """
 
-    center_x, center_y = coordinates
-    tile_list = []
-    for x in range(center_x - radius, center_x + radius + 1):
-        for y in range(center_y - radius, center_y + radius + 1):
-            tile_list.append((x, y))
+    tiles = radius_template(radius) + coordinates
+    return tiles if as_array else list(map(tuple, tiles.tolist()))
+
+
+@functools.lru_cache(maxsize=4096)
+def line_template(dx, dy):
+    """
+    returns the offsets of the tiles of a line starting at (0, 0). Lines only depend on the difference between their
+    ends, so templates are computed once and moved to the origin of every line.
+    :param dx: x offset of the destination
+    :param dy: y offset of the destination
+    :return: read only numpy array of shape (n, 2)
+    """
+
+    template = tcod.los.bresenham((0, 0), (dx, dy)).astype(int)
+    template.setflags(write=False)
+    return template
+
+
+@functools.cache
+def radius_template(radius):
+    """
+    returns the offsets of the tiles within a radius of (0, 0), as used by find_radius.
+    :param radius: radius length
+    :return: read only numpy array of shape (n, 2), in x then y order
+    """
+
+    offsets = np.arange(-radius, radius + 1)
+    xs, ys = np.meshgrid(offsets, offsets, indexing='ij')
+    inside = xs ** 2 + ys ** 2 <= radius * (radius + 1)
 
-    return tile_list
+    template = np.stack([xs[inside], ys[inside]], axis=1)
+    template.setflags(write=False)
+    return template
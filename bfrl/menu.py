@@ -3,14 +3,21 @@ import pygame
 import sys
 
 # game files
+from bfrl import area
 from bfrl import constants
 from bfrl import draw
+from bfrl import events
 from bfrl import maps
 from bfrl import game
 from bfrl import globals
 
 
-def main():
+def main(seed=None, record_path=None):
+    """
+    Shows the main menu
+    :param seed: seed used by new games. A random seed is used if None.
+    :param record_path: if given, the input of new games is recorded to this file
+    """
 
     # UI Addresses
     center_x, center_y = (constants.CAMERA_WIDTH / 2, constants.CAMERA_HEIGHT / 2)
@@ -76,10 +83,14 @@ def main():
     pygame.mixer.music.load(globals.ASSETS.main_menu)
     pygame.mixer.music.play(loops=-1)
 
+    # the first frame is drawn right away, then the menu sleeps until there is input
+    wait_timeout = 0
+
     menu_running = True
     while menu_running:
 
-        list_of_events = pygame.event.get()
+        list_of_events = events.wait(wait_timeout)
+        wait_timeout = None
         mouse_position = pygame.mouse.get_pos()
 
         game_input = (list_of_events, mouse_position)
@@ -92,11 +103,11 @@ def main():
         # button updates
         if continue_button.update(game_input):
             pygame.mixer.music.stop()
-            game.start(continue_game=True)
+            game.start(continue_game=True, seed=seed, record_path=record_path)
 
         if new_game_button.update(game_input):
             pygame.mixer.music.stop()
-            game.start(continue_game=False)
+            game.start(continue_game=False, seed=seed, record_path=record_path)
 
         if options_button.update(game_input):
             options()
@@ -107,7 +118,7 @@ def main():
             sys.exit()
 
         # draw menu
-        globals.SURFACE_MAIN.blit(globals.ASSETS.main_menu_bg, (0, 0))
+        globals.SURFACE_MAIN.blit(globals.ASSETS.sprite('main_menu_bg'), (0, 0))
         draw.text(**game_title)
         draw.text(**footer)
 
@@ -179,10 +190,14 @@ def options():
     }
     save_preferences_button = draw.UIButton(**save_preferences_button_attributes)
 
+    # the first frame is drawn right away, then the menu sleeps until there is input
+    wait_timeout = 0
+
     menu_close = False
     while not menu_close:
 
-        list_of_events = pygame.event.get()
+        list_of_events = events.wait(wait_timeout)
+        wait_timeout = None
         mouse_position = pygame.mouse.get_pos()
 
         game_input = (list_of_events, mouse_position)
@@ -238,8 +253,14 @@ def pause():
 
     text_location = (int(window_width/2 - text_width/2), int(window_height/2 - text_height/2))
 
+    # the paused screen never changes, so it is drawn once and the menu sleeps until a key is pressed
+    font_color = constants.COLOR_WHITE
+    bg_color = constants.COLOR_BLACK
+    draw.text(globals.SURFACE_MAIN, menu_text, constants.FONT_DEBUG_MESSAGE, text_location, font_color, bg_color)
+    pygame.display.flip()
+
     while not menu_close:
-        events_list = pygame.event.get()
+        events_list = events.wait()
         for event in events_list:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_p:
@@ -247,12 +268,6 @@ def pause():
                 if event.key == pygame.K_ESCAPE:
                     menu_close = True
 
-        font_color = constants.COLOR_WHITE
-        bg_color = constants.COLOR_BLACK
-        draw.text(globals.SURFACE_MAIN, menu_text, constants.FONT_DEBUG_MESSAGE, text_location, font_color, bg_color)
-        globals.CLOCK.tick(constants.GAME_FPS)
-        pygame.display.flip()
-
 
 def inventory():
 
@@ -267,30 +282,31 @@ def inventory():
 
     menu_location = (menu_x, menu_y)
 
-    menu_font = constants.FONT_MESSAGE_TEXT
-    menu_text_height = draw.helper_text_height(menu_font)
+    # rows are rendered when the inventory changes, not every frame
+    item_list = draw.UIList(
+        (menu_width, menu_height), constants.FONT_MESSAGE_TEXT,
+        constants.COLOR_WHITE, constants.COLOR_BLACK, constants.COLOR_GREY
+    )
+    inventory_revision = None
 
-    inventory_surface = pygame.Surface((menu_width, menu_height))
+    # the first frame is drawn right away
+    wait_timeout = 0
 
     menu_close = False
     while not menu_close:
 
-        menu_font = constants.FONT_MESSAGE_TEXT
-        menu_font_color = constants.COLOR_WHITE
-        menu_bg_color = constants.COLOR_BLACK
-        menu_mouse_over_bg = constants.COLOR_GREY
-
-        # Clear the menu
-        inventory_surface.fill(constants.COLOR_BLACK)
+        # Collect list of item names, grouped by kind
+        container = globals.PLAYER.container
+        if container.revision != inventory_revision:
+            inventory_revision = container.revision
+            items = container.items_by_kind()
+            item_list.set_items([item.display_name for item in items])
 
-        # Collect list of item names
-        item_list = [item.display_name for item in globals.PLAYER.container.inventory]
-
-        # Get list of input events
-        events_list = pygame.event.get()
+        # Wait for input, or until the game behind the menu needs a new animation image
+        events_list = events.wait(wait_timeout)
 
         # Get mouse coordinates relative to inventory window
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        mouse_x, mouse_y = events.mouse_position()
         mouse_x_relative = mouse_x - menu_x
         mouse_y_relative = mouse_y - menu_y
 
@@ -298,7 +314,7 @@ def inventory():
         mouse_in_window = (0 < mouse_x_relative < menu_width and 0 < mouse_y_relative < menu_height)
 
         # convert mouse height to inventory line
-        mouse_line_selection = int(mouse_y_relative / menu_text_height)
+        mouse_line_selection = item_list.row_at(mouse_y_relative) if mouse_in_window else None
 
         for event in events_list:
             if event.type == pygame.KEYDOWN:
@@ -307,67 +323,72 @@ def inventory():
                 if event.key == pygame.K_ESCAPE:
                     menu_close = True
             if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1 and mouse_in_window and mouse_line_selection <= len(item_list):
-                    globals.PLAYER.container.inventory[mouse_line_selection].item.use()
-                    globals.CLOCK.tick(constants.GAME_FPS)
+                if event.button == 1 and mouse_line_selection is not None:
+                    items[mouse_line_selection].item.use()
                     # TODO keep inventory open if item is an equipment
                     menu_close = True
 
-        # Draw item list
-        for line, name in enumerate(item_list):
-            name_location = (0, 0 + line * menu_text_height)
-            if line == mouse_line_selection and mouse_in_window:
-                draw.text(inventory_surface, name, menu_font, name_location, menu_font_color, menu_mouse_over_bg)
-            else:
-                draw.text(inventory_surface, name, menu_font, name_location, menu_font_color, menu_bg_color)
+                # the mouse wheel scrolls lists longer than the window
+                if event.button == 4:
+                    item_list.scroll(-1)
+                if event.button == 5:
+                    item_list.scroll(1)
 
-        # Render Game
+        # the list may have scrolled under the mouse
+        item_list.highlight(item_list.row_at(mouse_y_relative) if mouse_in_window else None)
 
+        # Render Game
+        # the clock may not have ticked since long before the menu opened, so the step is capped like in the main loop
+        time_step = globals.CLOCK.tick(constants.GAME_FPS) / 1000
+        game.animate(min(time_step, constants.ANIMATION_TICK * constants.ANIMATION_MAX_TICKS))
         draw.game()
 
         # Display Menu
-        globals.SURFACE_MAIN.blit(inventory_surface, menu_location)
-        globals.CLOCK.tick(constants.GAME_FPS)
+        globals.SURFACE_MAIN.blit(item_list.draw(), menu_location)
         pygame.display.flip()
 
+        wait_timeout = draw.animation_delay()
+
 
-def tile_select(origin=None, max_range=None, ignore_walls=True, ignore_creatures=True, radius=None):
+def tile_select(origin=None, max_range=None, ignore_walls=True, ignore_creatures=True, area_of_effect=None):
     """
     This menu lets the player select a tile on the map.
     The game pauses, produces a screen rectangle, and returns the map address when the LMB is clicked.
+    The paused world is drawn once, and the targeting overlay is drawn on a copy of it whenever the hovered tile
+    changes. Nothing is drawn while the mouse stays on the same tile.
+    :param area_of_effect: function returning the area.Line, Circle, Square or Cone of a spell aimed at a tile. The
+    tiles it covers are shown in red.
     :return: (x,y) map address tuple
     """
 
+    # the world is frozen while the player aims, so it is drawn once
+    draw.world()
+    world_frame = globals.SURFACE_MAP.copy()
+
+    hovered_tile = None
+    list_of_tiles = []
+
+    # the first frame is drawn right away, then the menu sleeps until there is input
+    wait_timeout = 0
+
     menu_close = False
     while not menu_close:
 
+        events_list = events.wait(wait_timeout)
+        wait_timeout = None
+
         # get mouse position
-        mouse_coordinates = pygame.mouse.get_pos()
+        mouse_coordinates = events.mouse_position()
         map_coordinate_x, map_coordinate_y = globals.CAMERA.window_to_map(mouse_coordinates)
 
-        map_address_x = int(map_coordinate_x / constants.CELL_WIDTH)
-        map_address_y = int(map_coordinate_y / constants.CELL_HEIGHT)
-
-        if origin:
-            list_of_tiles = maps.find_line(origin, (map_address_x, map_address_y))
-        else:
-            list_of_tiles = [(map_address_x, map_address_y)]
-
-        if max_range:
-            list_of_tiles = list_of_tiles[:max_range + 1]
+        map_address = (int(map_coordinate_x / constants.CELL_WIDTH), int(map_coordinate_y / constants.CELL_HEIGHT))
 
-        for i, (x, y) in enumerate(list_of_tiles):
-            if i == 0:
-                continue
-            if not ignore_walls and globals.GAME.current_map.check_for_wall(x, y):
-                list_of_tiles = list_of_tiles[:i + 1]
-                break
-            if not ignore_creatures and globals.GAME.current_map.check_for_creature(x, y):
-                list_of_tiles = list_of_tiles[:i + 1]
-                break
+        hover_changed = map_address != hovered_tile
+        if hover_changed:
+            hovered_tile = map_address
+            list_of_tiles = target_tiles(origin, map_address, max_range, ignore_walls, ignore_creatures)
 
         # get button clicks
-        events_list = pygame.event.get()
         for event in events_list:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_l:
@@ -378,16 +399,12 @@ def tile_select(origin=None, max_range=None, ignore_walls=True, ignore_creatures
                 if event.button == 1:
                     return list_of_tiles[-1]
 
-        # draw game first
-        globals.SURFACE_MAIN.fill(constants.COLOR_DEFAULT_BG)
-        globals.SURFACE_MAP.fill(constants.COLOR_DEFAULT_BG)
-
-        globals.CAMERA.update()
+        if not hover_changed:
+            continue
 
-        # draw the map first
-        draw.map_surface(globals.GAME.current_map.map_tiles)
-        for obj in globals.GAME.objects_on_map:
-            obj.draw()
+        # draw the targeting overlay on the frozen world
+        globals.SURFACE_MAIN.fill(constants.COLOR_DEFAULT_BG)
+        globals.SURFACE_MAP.blit(world_frame, (0, 0))
 
         # draw rectangle at mouse position on top of game
         if len(list_of_tiles) > 1:
@@ -398,19 +415,48 @@ def tile_select(origin=None, max_range=None, ignore_walls=True, ignore_creatures
                     draw.tile_rect(tile)
 
             # TODO: Show radius if len = 1
-            if radius:
-                area_of_effect = maps.find_radius(list_of_tiles[-1], radius)
-                for x, y in area_of_effect:
+            if area_of_effect:
+                area_tiles = area.tiles(globals.GAME.current_map, area_of_effect(list_of_tiles[-1]))
+                for x, y in area_tiles.tolist():
                     draw.tile_rect((x, y), tile_color=constants.COLOR_RED)
 
         else:
-            draw.tile_rect((map_address_x, map_address_y), marker='X')
+            draw.tile_rect(map_address, marker='X')
 
         # update main surface with the new map
-        globals.SURFACE_MAIN.blit(globals.SURFACE_MAP, (0, 0), globals.CAMERA.rectangle)
+        globals.SURFACE_MAIN.blit(globals.SURFACE_MAP, (0, 0))
 
         draw.debug()
         draw.messages()
 
-        globals.CLOCK.tick(constants.GAME_FPS)
         pygame.display.flip()
+
+
+def target_tiles(origin, target, max_range, ignore_walls, ignore_creatures):
+    """
+    returns the tiles a targeting line goes through, from the origin to the hovered tile.
+    :param origin: (x, y) tile the line starts from. Only the target tile is returned if None.
+    :param target: (x, y) hovered tile
+    :param max_range: maximum number of tiles after the origin, unlimited if None
+    :param ignore_walls: False to stop the line on the first wall
+    :param ignore_creatures: False to stop the line on the first creature
+    :return: list of (x, y) tiles, the selected tile last
+    """
+
+    if origin:
+        list_of_tiles = maps.find_line(origin, target)
+    else:
+        list_of_tiles = [target]
+
+    if max_range:
+        list_of_tiles = list_of_tiles[:max_range + 1]
+
+    for i, (x, y) in enumerate(list_of_tiles):
+        if i == 0:
+            continue
+        if not ignore_walls and globals.GAME.current_map.check_for_wall(x, y):
+            return list_of_tiles[:i + 1]
+        if not ignore_creatures and globals.GAME.current_map.check_for_creature(x, y):
+            return list_of_tiles[:i + 1]
+
+    return list_of_tiles
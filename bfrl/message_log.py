@@ -0,0 +1,88 @@
+# modules
+import collections
+import os
+import shutil
+
+
+class MessageLog:
+    """
+    The message log keeps the most recent messages in memory and streams every message to a file on disk, so
+    long games do not grow the memory used or the size of the save game.
+
+    ** PROPERTIES **
+    MessageLog.recent : ring buffer with the last (message, color) tuples pushed to the player.
+    MessageLog.file_path : path of the file every message is written to.
+
+    ** METHODS **
+    MessageLog.append : adds a message to the ring buffer and to the file.
+    MessageLog.last : returns the last messages, oldest first.
+    MessageLog.export : appends the full message history to another file.
+    MessageLog.delete : removes the file from the disk.
+    """
+
+    def __init__(self, file_path, max_messages):
+        """
+        :param file_path: file the messages are streamed to. It is emptied when the log is created.
+        :param max_messages: number of messages kept in memory
+        """
+
+        self.recent = collections.deque(maxlen=max_messages)
+        self.file_path = file_path
+
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        self.file = open(self.file_path, 'w', encoding='utf-8')
+
+    def __getstate__(self):
+
+        # the open file can't be saved, it is reopened on the next message
+        if self.file:
+            self.file.flush()
+
+        state = self.__dict__.copy()
+        state['file'] = None
+        return state
+
+    def append(self, message, color):
+
+        self.recent.append((message, color))
+
+        if self.file is None:
+            self.file = open(self.file_path, 'a', encoding='utf-8')
+        self.file.write(f'{message}\n')
+
+    def last(self, number_of_messages):
+        """
+        returns the last messages without copying the whole ring buffer.
+        :param number_of_messages: maximum number of messages returned
+        :return: list of (message, color) tuples, oldest first
+        """
+
+        number_of_messages = min(number_of_messages, len(self.recent))
+        return [self.recent[index] for index in range(-number_of_messages, 0)]
+
+    def export(self, destination):
+        """
+        Appends every message of the game to a file.
+        :param destination: path of the file
+        """
+
+        if self.file:
+            self.file.flush()
+
+        if not os.path.exists(self.file_path):
+            return
+
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        with open(self.file_path, 'r', encoding='utf-8') as source, open(destination, 'a+', encoding='utf-8') as target:
+            shutil.copyfileobj(source, target)
+
+    def delete(self):
+
+        if self.file:
+            self.file.close()
+            self.file = None
+
+        try:
+            os.remove(self.file_path)
+        except OSError:
+            pass
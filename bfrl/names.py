@@ -0,0 +1,147 @@
+# modules
+import collections
+import concurrent.futures
+import functools
+import tcod
+
+# game files
+from bfrl import constants
+
+
+class NamePool:
+    """
+    The name pool generates creature names in batches, one pool per name set, so spawning a creature only takes a
+    name that is ready. Pools are refilled between levels, by a background thread while the player is playing. A
+    pool that runs out while a level is populated waits for a new batch.
+
+    Names come from the libtcod default generator. Batches are requested from the main thread, depending only on how
+    many names were taken, and the thread generates them one at a time in that order, so the same seed always gives
+    the same names whether batches are generated in the background or on the spot.
+
+    ** PROPERTIES **
+    NamePool.names : dictionary of name set to the deque of names ready to be taken.
+    NamePool.batches : dictionary of name set to the deque of futures of the batches requested.
+
+    ** METHODS **
+    NamePool.take : returns a name of a set, optionally one that is not used yet.
+    NamePool.refill : requests a batch for every set with less than a batch of names ready or requested.
+    NamePool.reseed : drops every name and batch, reseeds libtcod and requests the first batch of every set.
+    NamePool.shutdown : drops every name and batch and stops the background thread.
+    """
+
+    def __init__(self, name_sets, batch_size, background=True):
+        """
+        :param name_sets: name sets of the name generator rules, 'Celtic male' for example
+        :param batch_size: number of names generated at once
+        :param background: True to generate batches in a background thread, False to generate them on the spot
+        """
+
+        self.name_sets = name_sets
+        self.batch_size = batch_size
+        self.background = background
+
+        self.executor = None
+        self.names = {name_set: collections.deque() for name_set in name_sets}
+        self.batches = {name_set: collections.deque() for name_set in name_sets}
+
+    def request(self, name_set):
+        """
+        Requests a batch of names, generated by the background thread, which is started on the first request.
+        :param name_set: name set of the batch
+        """
+
+        if not self.background:
+            future = concurrent.futures.Future()
+            future.set_result(generate_names(name_set, self.batch_size))
+        else:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='names')
+            future = self.executor.submit(generate_names, name_set, self.batch_size)
+
+        self.batches[name_set].append(future)
+
+    def next_name(self, name_set):
+
+        names = self.names[name_set]
+        if not names:
+            if not self.batches[name_set]:
+                self.request(name_set)
+            names.extend(self.batches[name_set].popleft().result())
+
+        return names.popleft()
+
+    def take(self, name_set, used=None):
+        """
+        returns a name of a set, waiting for its batch if it is still being generated.
+        :param name_set: name set of the name generator rules, 'Celtic male' for example
+        :param used: set of names that should not be returned, the name returned is added to it. After
+        NAME_ATTEMPTS used names in a row, the last one is returned anyway.
+        :return: name string
+        """
+
+        name = self.next_name(name_set)
+        if used is None:
+            return name
+
+        for _ in range(constants.NAME_ATTEMPTS):
+            if name not in used:
+                break
+            name = self.next_name(name_set)
+
+        used.add(name)
+        return name
+
+    def refill(self):
+        """Requests a batch for every set with less than a batch of names ready or requested"""
+
+        for name_set in self.name_sets:
+            if len(self.names[name_set]) + len(self.batches[name_set]) * self.batch_size < self.batch_size:
+                self.request(name_set)
+
+    def clear(self):
+
+        for name_set in self.name_sets:
+            self.names[name_set].clear()
+
+            # a batch being generated still draws from libtcod, so it is finished before libtcod is seeded again
+            for future in self.batches[name_set]:
+                future.cancel()
+            concurrent.futures.wait(self.batches[name_set])
+            self.batches[name_set].clear()
+
+    def reseed(self, random_service):
+        """
+        Drops every name and batch, which came from the previous libtcod seed, seeds libtcod from a random service
+        and requests the first batch of every set.
+        :param random_service: rng.RandomService of the game
+        """
+
+        self.clear()
+        random_service.seed_libtcod()
+        self.refill()
+
+    def shutdown(self):
+
+        self.clear()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+@functools.cache
+def load_name_generator():
+    """Parses the name generator rules. Rules are parsed once, the first time a name is generated."""
+
+    tcod.namegen_parse(constants.NAME_GENERATOR_PATH)
+
+
+def generate_names(name_set, number_of_names):
+    """
+    Generates names with the libtcod name generator.
+    :param name_set: name set of the name generator rules
+    :param number_of_names: number of names generated
+    :return: list of name strings
+    """
+
+    load_name_generator()
+    return [tcod.namegen_generate(name_set) for _ in range(number_of_names)]
@@ -0,0 +1,180 @@
+# modules
+import collections
+import json
+import os
+import time
+
+
+class FrameProfiler:
+    """
+    The frame profiler records how long each stage of a frame takes. Stages are closed in order by calling mark, so
+    the time of a stage is the time elapsed since the previous mark. The last frames are kept in a ring buffer.
+
+    ** PROPERTIES **
+    FrameProfiler.frames : ring buffer with the last recorded frames, oldest first.
+    FrameProfiler.visible : True if the profiler overlay should be drawn.
+
+    ** METHODS **
+    FrameProfiler.begin_frame : starts recording a new frame.
+    FrameProfiler.mark : closes the current stage of the frame with a given name.
+    FrameProfiler.end_frame : stores the frame in the ring buffer.
+    FrameProfiler.averages : average time of each stage over the ring buffer.
+    FrameProfiler.dump : writes the ring buffer to a chrome://tracing compatible file.
+    """
+
+    def __init__(self, max_frames=300):
+        """
+        :param max_frames: number of frames kept in the ring buffer
+        """
+
+        self.frames = collections.deque(maxlen=max_frames)
+        self.visible = False
+
+        self.frame_start = None
+        self.last_mark = None
+        self.stages = None
+
+    def begin_frame(self):
+        self.frame_start = self.last_mark = time.perf_counter()
+        self.stages = []
+
+    def mark(self, stage):
+        """
+        Closes a stage. Does nothing if no frame is being recorded.
+        :param stage: name of the stage that just finished
+        """
+
+        if self.frame_start is None:
+            return
+
+        now = time.perf_counter()
+        self.stages.append((stage, self.last_mark, now - self.last_mark))
+        self.last_mark = now
+
+    def end_frame(self):
+
+        if self.frame_start is None:
+            return
+
+        self.frames.append((self.frame_start, self.last_mark - self.frame_start, self.stages))
+        self.frame_start = None
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    @property
+    def last_frame(self):
+        """
+        returns the stage times of the last recorded frame.
+        :return: dictionary of stage name to seconds
+        """
+
+        if not self.frames:
+            return {}
+
+        return self.stage_totals(self.frames[-1])
+
+    @staticmethod
+    def stage_totals(frame):
+
+        _, _, stages = frame
+        totals = {}
+        for stage, _, duration in stages:
+            totals[stage] = totals.get(stage, 0.0) + duration
+
+        return totals
+
+    def averages(self):
+        """
+        returns the average time of each stage over all recorded frames.
+        :return: dictionary of stage name to seconds
+        """
+
+        if not self.frames:
+            return {}
+
+        totals = {}
+        for frame in self.frames:
+            for stage, duration in self.stage_totals(frame).items():
+                totals[stage] = totals.get(stage, 0.0) + duration
+
+        return {stage: total / len(self.frames) for stage, total in totals.items()}
+
+    def dump(self, directory='data/profiles'):
+        """
+        Writes the recorded frames to a trace file that can be opened in chrome://tracing or Perfetto.
+        :param directory: folder where the trace is created
+        :return: path of the trace file
+        """
+
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json")
+
+        events = []
+        for frame_number, (frame_start, frame_duration, stages) in enumerate(self.frames):
+            events.append({
+                'name': 'frame', 'cat': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0,
+                'ts': frame_start * 1e6, 'dur': frame_duration * 1e6, 'args': {'frame': frame_number},
+            })
+            for stage, stage_start, duration in stages:
+                events.append({
+                    'name': stage, 'cat': 'stage', 'ph': 'X', 'pid': 0, 'tid': 0,
+                    'ts': stage_start * 1e6, 'dur': duration * 1e6,
+                })
+
+        with open(file_path, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+
+        return file_path
+
+
+class StartupTimeline:
+    """
+    The startup timeline records how long each step of the game launch takes, from the moment it is created.
+
+    ** PROPERTIES **
+    StartupTimeline.steps : list of (step name, duration in seconds), in order.
+
+    ** METHODS **
+    StartupTimeline.mark : closes the current step with a given name.
+    StartupTimeline.report : returns the timeline as printable text.
+    """
+
+    def __init__(self, start=None):
+        """
+        :param start: time.perf_counter value the timeline starts at. Starts now if None.
+        """
+
+        self.start = self.last_mark = time.perf_counter() if start is None else start
+        self.steps = []
+
+    def mark(self, step):
+
+        now = time.perf_counter()
+        self.steps.append((step, now - self.last_mark))
+        self.last_mark = now
+
+    def report(self, bar_width=40):
+        """
+        returns one line per step with its duration, the time elapsed since the start, and a bar proportional to
+        the duration.
+        :param bar_width: width of the bar of the longest step, in characters
+        :return: report string
+        """
+
+        if not self.steps:
+            return 'no startup steps recorded'
+
+        name_width = max(len(step) for step, _ in self.steps)
+        longest = max(duration for _, duration in self.steps) or 1.0
+
+        lines = []
+        elapsed = 0.0
+        for step, duration in self.steps:
+            elapsed += duration
+            bar = '#' * round(duration / longest * bar_width)
+            lines.append(f'{step:<{name_width}}  {duration * 1000:8.1f} ms  {elapsed * 1000:8.1f} ms  {bar}')
+        lines.append(f"{'total':<{name_width}}  {elapsed * 1000:8.1f} ms")
+
+        return '\n'.join(lines)
+
@@ -0,0 +1,75 @@
+# modules
+import numpy as np
+import random
+import tcod
+import zlib
+
+
+class RandomService:
+    """
+    The random service is the single source of randomness of a game. Every subsystem draws from its own stream, and
+    every stream is seeded from the game seed and the stream name, so the same seed always produces the same game
+    and extra draws in one subsystem do not change the others.
+
+    ** PROPERTIES **
+    RandomService.seed : integer the game was started with.
+    RandomService.streams : dictionary of stream name to random.Random instance.
+    RandomService.numpy_streams : dictionary of stream name to numpy Generator instance.
+
+    ** METHODS **
+    RandomService.stream : returns the random stream of a subsystem.
+    RandomService.numpy_stream : returns the numpy random stream of a subsystem, for vectorized draws.
+    RandomService.numpy_seed : returns the seed of a numpy stream, to recreate it in another process.
+    RandomService.seed_libtcod : seeds the libtcod default generator, used by the name generator.
+    """
+
+    def __init__(self, seed=None):
+        """
+        :param seed: integer seed. A random seed is picked if None.
+        """
+
+        if seed is None:
+            seed = random.SystemRandom().randrange(2 ** 32)
+
+        self.seed = seed
+        self.streams = {}
+        self.numpy_streams = {}
+
+    def stream(self, name):
+        """
+        returns the random stream of a subsystem, creating it the first time it is requested.
+        :param name: subsystem name, 'maps' or 'ai' for example
+        :return: random.Random instance
+        """
+
+        if name not in self.streams:
+            self.streams[name] = random.Random(f'{self.seed}:{name}')
+
+        return self.streams[name]
+
+    def numpy_stream(self, name):
+        """
+        returns the numpy random stream of a subsystem, creating it the first time it is requested.
+        :param name: subsystem name, 'maps' or 'ai' for example
+        :return: numpy.random.Generator instance
+        """
+
+        if name not in self.numpy_streams:
+            self.numpy_streams[name] = np.random.default_rng(self.numpy_seed(name))
+
+        return self.numpy_streams[name]
+
+    def numpy_seed(self, name):
+        """
+        returns the seed of the numpy stream of a subsystem. numpy.random.default_rng(seed) starts the same stream.
+        :param name: subsystem name
+        :return: hashable tuple of integers
+        """
+
+        return self.seed, zlib.crc32(name.encode())
+
+    def seed_libtcod(self):
+        """Seeds the libtcod default generator from the 'libtcod' stream"""
+
+        libtcod_seed = self.stream('libtcod').randrange(2 ** 32)
+        tcod.random_restore(None, tcod.random_new_from_seed(libtcod_seed))
@@ -1,7 +1,5 @@
 # modules
-import random
 import pygame
-import tcod
 
 # game files
 from bfrl import constants
@@ -9,43 +7,67 @@ from bfrl import game
 from bfrl import globals
 from bfrl import data
 from bfrl import camera
+from bfrl import layout
+from bfrl import maps
+from bfrl import names
 from bfrl import assets
+from bfrl import profiler
+from bfrl import rng
 
 
-def init():
+def init(timeline=None):
+    """
+    Initializes pygame and the game services. Fonts and the name generator rules are loaded on first use.
+    :param timeline: profiler.StartupTimeline marked after each step. A discarded one is used if None.
+    """
+
+    timeline = timeline or profiler.StartupTimeline()
 
     # initialize pygame
     pygame.init()
     pygame.key.set_repeat(200, 70)
     globals.init()
-
-    tcod.namegen_parse('data/name_generator/celtic.cfg')
+    timeline.mark('pygame.init')
 
     # PREFERENCES tracks user preferences
     try:
         game.preferences_load()
     except FileNotFoundError:
         globals.PREFERENCES = data.Preferences()
+    timeline.mark('preferences')
 
     # create display surface with a given Height, and Width
     globals.SURFACE_MAIN = pygame.display.set_mode((constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
+    timeline.mark('display')
 
-    globals.SURFACE_MAP = pygame.Surface((
-        constants.MAP_WIDTH * constants.CELL_WIDTH,
-        constants.MAP_HEIGHT * constants.CELL_HEIGHT
-    ))
+    # the map is drawn on a surface the size of the camera, so its memory does not grow with the map
+    globals.SURFACE_MAP = pygame.Surface((constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
 
     # CAMERA tracks what is shown on the display
     globals.CAMERA = camera.ObjectCamera()
 
     # ASSETS stores the game assets
     globals.ASSETS = assets.Assets()
+    timeline.mark('assets')
 
     # CLOCK tracks and limits CPU cycles
     globals.CLOCK = pygame.time.Clock()
 
-    # RANDOM NUMBER ENGINE
-    globals.RANDOM_ENGINE = random.SystemRandom()
+    # PROFILER records how long each stage of a frame takes
+    globals.PROFILER = profiler.FrameProfiler(constants.PROFILER_MAX_FRAMES)
+
+    # RANDOM NUMBER ENGINE, replaced by a seeded one when a game starts
+    globals.RANDOM_ENGINE = rng.RandomService()
+
+    # LEVEL_GENERATOR builds the layout of the next level in a worker process
+    globals.LEVEL_GENERATOR = layout.LevelGenerator()
+
+    # NAME_POOL generates creature names in batches, ahead of the spawns that use them
+    globals.NAME_POOL = names.NamePool(constants.NAME_SETS, constants.NAME_BATCH_SIZE, constants.NAME_BACKGROUND)
+
+    # FOV_MAP tracks the tiles the player can see
+    globals.FOV_MAP = maps.FieldOfView()
 
     # When FOV is true, FOV recalculates
     globals.FOV_CALCULATE = True
+    timeline.mark('services')
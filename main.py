@@ -1,6 +1,41 @@
-from bfrl import startup
-from bfrl import menu
+import argparse
+import os
+import time
+
+# the startup timeline counts from here
+STARTED = time.perf_counter()
+
 
 if __name__ == "__main__":
-    startup.init()
-    menu.main()
+
+    # everything runs under the main guard, level generation workers import this module again
+    parser = argparse.ArgumentParser(description='Battle Fortune Rogue Like')
+    parser.add_argument('--seed', type=int, help='seed used by new games')
+    parser.add_argument('--record', metavar='FILE', help='record the input of a new game to a file')
+    parser.add_argument('--replay', metavar='FILE', help='replay a recorded game headlessly, as fast as possible')
+    parser.add_argument('--profile-startup', action='store_true', help='print how long each startup step takes')
+    args = parser.parse_args()
+
+    if args.replay:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+    from bfrl import profiler
+    timeline = profiler.StartupTimeline(STARTED)
+
+    # pygame is most of the import time, so it is timed on its own
+    import pygame
+    timeline.mark('import pygame')
+
+    from bfrl import startup
+    from bfrl import menu
+    from bfrl import game
+    timeline.mark('import bfrl')
+
+    startup.init(timeline)
+    if args.profile_startup:
+        print(timeline.report())
+    if args.replay:
+        game.replay(args.replay)
+    else:
+        menu.main(seed=args.seed, record_path=args.record)